@@ -0,0 +1,142 @@
+"""
+Время типовых выборок db/utils до и после индексов из db/migrations.
+
+База наполняется напрямую (по умолчанию 1M постов, по 2 тега на пост),
+затем индексы моделей удаляются, замеряются запросы, apply_migrations
+создаёт индексы заново и запросы замеряются повторно.
+
+Запуск: python -m benchmarks.bench_db_indexes [--posts 1000000]
+"""
+import argparse
+import datetime
+import os
+import random
+import tempfile
+import time
+
+from sqlalchemy import create_engine, text
+
+from db.migrations import apply_migrations
+from db.models import Base
+
+QUERIES = {
+    "post by (chat_id, message_id)":
+        "SELECT id FROM parsed_posts WHERE chat_id = :chat_id "
+        "AND message_id = :message_id",
+    "post_tags by post_id":
+        "SELECT tag_id FROM post_tags WHERE post_id = :post_id",
+    "target by (chat_id, user_id)":
+        "SELECT id FROM target_channels WHERE chat_id = :target_chat "
+        "AND user_id = :user_id",
+    "channel by chat_id":
+        "SELECT title FROM channels_to_listen WHERE chat_id = :source_chat",
+    "posts older than ts (count)":
+        "SELECT COUNT(*) FROM parsed_posts WHERE ts < :ts",
+}
+
+
+def populate(conn, posts: int, sources: int, targets: int):
+    rnd = random.Random(1)
+    start_ts = datetime.datetime(2024, 1, 1)
+
+    conn.exec_driver_sql(
+        "INSERT INTO users (id, telegram_id) VALUES (?, ?)",
+        [(i, 10_000 + i) for i in range(1, 501)])
+    conn.exec_driver_sql(
+        "INSERT INTO tags (id, name) VALUES (?, ?)",
+        [(i, f"tag_{i}") for i in range(1, 22)])
+    conn.exec_driver_sql(
+        "INSERT INTO channels_to_listen (chat_id, title, user_id) "
+        "VALUES (?, ?, ?)",
+        [(-100 - i, f"source {i}", i % 500 + 1) for i in range(sources)])
+    conn.exec_driver_sql(
+        "INSERT INTO target_channels (chat_id, title, user_id) "
+        "VALUES (?, ?, ?)",
+        [(-200_000 - i, f"target {i}", i % 500 + 1) for i in range(targets)])
+
+    batch = 50_000
+    for offset in range(0, posts, batch):
+        rows = []
+        tag_rows = []
+        for post_id in range(offset + 1, min(posts, offset + batch) + 1):
+            ts = start_ts + datetime.timedelta(seconds=post_id * 10)
+            rows.append((post_id, post_id, -100 - post_id % sources,
+                         f"текст поста {post_id}", ts))
+            for tag_id in rnd.sample(range(1, 22), 2):
+                tag_rows.append((post_id, tag_id))
+        conn.exec_driver_sql(
+            "INSERT INTO parsed_posts (id, message_id, chat_id, text, ts) "
+            "VALUES (?, ?, ?, ?, ?)", rows)
+        conn.exec_driver_sql(
+            "INSERT INTO post_tags (post_id, tag_id) VALUES (?, ?)", tag_rows)
+
+
+def measure(engine, params, repeat: int):
+    results = {}
+    with engine.connect() as conn:
+        for name, sql in QUERIES.items():
+            statement = text(sql)
+            start = time.perf_counter()
+            for p in params[:repeat]:
+                conn.execute(statement, p).fetchall()
+            results[name] = (time.perf_counter() - start) / repeat * 1000
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--posts", type=int, default=1_000_000)
+    parser.add_argument("--sources", type=int, default=2_000)
+    parser.add_argument("--targets", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(), "bench.db")
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(engine)
+
+    # Схема «как до миграции»: только первичные ключи и старые ограничения
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            for index in table.indexes:
+                conn.exec_driver_sql(f"DROP INDEX IF EXISTS {index.name}")
+
+    start = time.perf_counter()
+    with engine.begin() as conn:
+        populate(conn, args.posts, args.sources, args.targets)
+    print(f"Наполнение ({args.posts} постов): "
+          f"{time.perf_counter() - start:.1f} s")
+
+    rnd = random.Random(2)
+    params = []
+    for _ in range(args.repeat):
+        post_id = rnd.randint(1, args.posts)
+        target = rnd.randrange(args.targets)
+        params.append({
+            "chat_id": -100 - post_id % args.sources,
+            "message_id": post_id,
+            "post_id": post_id,
+            "target_chat": -200_000 - target,
+            "user_id": target % 500 + 1,
+            "source_chat": -100 - rnd.randrange(args.sources),
+            "ts": datetime.datetime(2024, 1, 1, 12),
+        })
+
+    before = measure(engine, params, args.repeat)
+
+    start = time.perf_counter()
+    apply_migrations(engine)
+    print(f"apply_migrations: {time.perf_counter() - start:.1f} s")
+
+    after = measure(engine, params, args.repeat)
+
+    print(f"{'запрос':<32}{'без индексов':>14}{'с индексами':>14}")
+    for name in QUERIES:
+        print(f"{name:<32}{before[name]:>11.3f} ms{after[name]:>11.3f} ms")
+
+    engine.dispose()
+    os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
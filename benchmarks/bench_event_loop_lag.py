@@ -0,0 +1,110 @@
+"""
+Задержка цикла событий при всплеске из 1000 входящих постов:
+прямые синхронные вызовы SQLite в корутинах, поток БД (db.worker)
+и отложенная запись (db.write_behind).
+
+Каждый «пост» — поиск названия канала, save_post и вставка тегов, как
+в global_handler. Отдельная корутина тикает раз в 1 ms и меряет опоздание.
+
+Запуск: python -m benchmarks.bench_event_loop_lag [--posts 1000]
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+
+# db.session открывает data.db в текущем каталоге — уводим его во временный
+os.chdir(tempfile.mkdtemp())
+
+from sqlalchemy import insert  # noqa: E402
+
+from db import aio, utils  # noqa: E402
+from db.models import ParsedPost, PostTag  # noqa: E402
+from db.session import Session  # noqa: E402
+from db.worker import run_db  # noqa: E402
+from db.write_behind import PostWriteBuffer  # noqa: E402
+
+
+def tags_for(i: int):
+    return [1 + i % 21, 1 + (i + 7) % 21]
+
+
+def handle_post_sync(i: int):
+    # Прежний путь: коммит поста и отдельный коммит тегов
+    utils.get_channel_title(-100 - i % 50)
+    with Session() as session:
+        post = ParsedPost(message_id=i, chat_id=-100 - i % 50,
+                          text=f"текст поста {i}")
+        session.add(post)
+        session.commit()
+        post_id = post.id
+    with Session() as session:
+        session.execute(insert(PostTag), [
+            {"post_id": post_id, "tag_id": tag_id} for tag_id in tags_for(i)
+        ])
+        session.commit()
+
+
+async def blocking(i: int):
+    handle_post_sync(i)
+
+
+async def offloaded(i: int):
+    await run_db(handle_post_sync, i)
+
+
+buffer = PostWriteBuffer()
+
+
+async def write_behind(i: int):
+    await aio.get_channel_title(-100 - i % 50)
+    post = await buffer.add_post(i, -100 - i % 50, f"текст поста {i}")
+    await buffer.add_tags(post, tags_for(i))
+
+
+async def ticker(lags: list, stop: asyncio.Event, interval=0.001):
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        lags.append((time.perf_counter() - start - interval) * 1000)
+
+
+async def run_case(name: str, handler, posts: int):
+    lags = []
+    stop = asyncio.Event()
+    tick = asyncio.create_task(ticker(lags, stop))
+    await asyncio.sleep(0.05)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(handler(i) for i in range(posts)))
+    elapsed = time.perf_counter() - start
+
+    stop.set()
+    await tick
+    lags.sort()
+    print(f"{name:>12}: {posts} постов за {elapsed:.2f} s, лаг цикла "
+          f"p50={statistics.median(lags):.2f} ms "
+          f"p99={lags[int(len(lags) * 0.99)]:.2f} ms max={lags[-1]:.2f} ms "
+          f"(тиков: {len(lags)})")
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--posts", type=int, default=1000)
+    args = parser.parse_args()
+
+    utils.init_db()
+    await run_case("sync", blocking, args.posts)
+    await run_case("db thread", offloaded, args.posts)
+
+    buffer.start()
+    await run_case("write-behind", write_behind, args.posts)
+    await buffer.stop()
+    print(f"{'':>12}сбросов буфера: {buffer.flushes}, "
+          f"записано постов: {buffer.written_posts}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
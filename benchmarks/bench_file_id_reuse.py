@@ -0,0 +1,78 @@
+"""
+Раздача одной картинки по таргет-каналам: загрузка байтов в каждый канал
+против повторного использования file_id. Bot API имитируется: загрузка
+делит один исходящий канал заданной скорости, отправка по file_id — фиксированную задержку.
+
+Запуск: python -m benchmarks.bench_file_id_reuse [--channels 20]
+"""
+import argparse
+import asyncio
+import os
+import time
+from types import SimpleNamespace
+
+import db.utils as db_utils
+from img_generate.file_id_cache import FileIdCache
+from img_generate.generated_image import GeneratedImage
+
+
+class FakeBot:
+    def __init__(self, uplink_bytes_per_s, api_latency):
+        self.uplink = uplink_bytes_per_s
+        self.latency = api_latency
+        self.uploaded_bytes = 0
+        self._uplink_busy = asyncio.Lock()
+
+    async def send_photo(self, chat_id, photo, caption=None, **kwargs):
+        if not isinstance(photo, str):
+            self.uploaded_bytes += len(photo.data)
+            async with self._uplink_busy:
+                await asyncio.sleep(len(photo.data) / self.uplink)
+        await asyncio.sleep(self.latency)
+        return SimpleNamespace(photo=[SimpleNamespace(file_id="AgAC-bench")])
+
+
+async def upload_every_time(bot, chat_id, image, caption):
+    await db_utils.send_scheduler.submit(
+        chat_id, lambda: bot.send_photo(chat_id, image.input_file(),
+                                        caption=caption))
+
+
+async def run_case(name, send_photo, args):
+    bot = FakeBot(args.uplink_kb * 1024, args.latency / 1000)
+    image = GeneratedImage(os.urandom(args.image_kb * 1024))
+
+    latencies = []
+
+    async def send(chat_id):
+        start = time.perf_counter()
+        await send_photo(bot, chat_id, image, "пост")
+        latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(send(-100 - i) for i in range(args.channels)))
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    print(f"{name:>14}: {elapsed:.2f} s на {args.channels} каналов, "
+          f"медиана {latencies[len(latencies) // 2] * 1000:.0f} ms, "
+          f"загружено {bot.uploaded_bytes / 1024:.0f} KB")
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--channels", type=int, default=20)
+    parser.add_argument("--image-kb", type=int, default=300)
+    parser.add_argument("--uplink-kb", type=int, default=1024,
+                        help="скорость отправки, KB/s")
+    parser.add_argument("--latency", type=float, default=50,
+                        help="задержка Bot API, ms")
+    args = parser.parse_args()
+
+    await run_case("без кэша", upload_every_time, args)
+    db_utils.file_id_cache = FileIdCache()
+    await run_case("кэш file_id", db_utils.send_photo, args)
+    await db_utils.send_scheduler.stop()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,96 @@
+"""
+Стоимость разбора одного обновления Telethon в зависимости от числа
+подписок на клиенте: отдельный NewMessage(chats=...) на каждый канал
+против одного обработчика с таблицей каналов (client.listeners).
+Обновления подаются прямо в client._dispatch_update, без сети.
+
+Запуск: python -m benchmarks.bench_listener_dispatch [--subscriptions 5000]
+"""
+import argparse
+import asyncio
+import datetime
+import time
+
+from telethon import TelegramClient, events
+from telethon.sessions import StringSession
+from telethon.tl import types
+
+import client.listeners as listeners
+
+BASE_CHANNEL_ID = 1_000_000
+
+
+def marked_id(channel_id):
+    return -1_000_000_000_000 - channel_id
+
+
+def make_client():
+    client = TelegramClient(StringSession(), 1, "bench")
+    # _dispatch_update ждёт свой id в кэше, иначе полезет в сеть
+    client._mb_entity_cache.set_self_user(1, False, 0)
+    return client
+
+
+def make_update(channel_id):
+    message = types.Message(id=1, peer_id=types.PeerChannel(channel_id),
+                            date=datetime.datetime.now(), message="пост")
+    update = types.UpdateNewChannelMessage(message=message, pts=1,
+                                           pts_count=1)
+    update._entities = {}
+    return update
+
+
+async def measure(client, updates, rounds):
+    # Первый проход разрешает фильтры chats, он не измеряется
+    for update in updates:
+        await client._dispatch_update(update)
+
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for update in updates:
+            await client._dispatch_update(update)
+    return (time.perf_counter() - start) / (rounds * len(updates))
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--subscriptions", type=int, default=5000)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    received = 0
+
+    async def handler(event, owners=None):
+        nonlocal received
+        received += 1
+
+    listeners.global_handler = handler
+    channel_ids = [BASE_CHANNEL_ID + i for i in range(args.subscriptions)]
+    # Половина обновлений из подписанных каналов, половина — из чужих
+    updates = [make_update(channel_ids[i * 97 % len(channel_ids)])
+               for i in range(50)]
+    updates += [make_update(BASE_CHANNEL_ID * 2 + i) for i in range(50)]
+
+    legacy = make_client()
+    for channel_id in channel_ids:
+        legacy.add_event_handler(
+            handler, events.NewMessage(chats=marked_id(channel_id)))
+    per_chat = await measure(legacy, updates, args.rounds)
+    legacy_received, received = received, 0
+
+    table = make_client()
+    for channel_id in channel_ids:
+        listeners.subscriptions.add(table, marked_id(channel_id), 1)
+    dispatcher = listeners.get_dispatcher(table)
+    dispatcher.chats.update(marked_id(channel_id) for channel_id in channel_ids)
+    single = await measure(table, updates, args.rounds)
+
+    print(f"Подписок на клиента: {args.subscriptions}")
+    print(f"  обработчик на канал: {per_chat * 1e6:10.1f} мкс/обновление "
+          f"(доставлено {legacy_received})")
+    print(f"  один обработчик:     {single * 1e6:10.1f} мкс/обновление "
+          f"(доставлено {received})")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
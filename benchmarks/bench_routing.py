@@ -0,0 +1,103 @@
+"""
+Задержка маршрутизации поста по тегам при большом числе таргет-каналов.
+
+Запуск: python -m benchmarks.bench_routing [--targets 10000] [--legacy]
+"""
+import argparse
+import random
+import statistics
+import time
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from db.models import Base, Tag, TargetChannel, TargetChannelTag
+from db.routing_index import RoutingIndex
+
+
+def populate(session, targets: int, tags: int, tags_per_target: int):
+    session.add_all(Tag(id=i, name=f"tag_{i}") for i in range(1, tags + 1))
+    session.add_all(
+        TargetChannel(id=i, chat_id=-1000000000000 - i, user_id=i % 500 + 1,
+                      title=f"target {i}")
+        for i in range(1, targets + 1)
+    )
+    rnd = random.Random(42)
+    session.add_all(
+        TargetChannelTag(target_channel_id=tc_id, tag_id=tag_id)
+        for tc_id in range(1, targets + 1)
+        for tag_id in rnd.sample(range(1, tags + 1), tags_per_target)
+    )
+    session.commit()
+
+
+def legacy_match(session, tag_ids):
+    # Прежняя реализация: все таргет-каналы + запрос тегов для каждого
+    post_tag_ids = set(tag_ids)
+    result = []
+    for tc in session.query(TargetChannel).all():
+        allowed = session.query(TargetChannelTag).filter_by(
+            target_channel_id=tc.id
+        ).all()
+        if post_tag_ids & {at.tag_id for at in allowed}:
+            result.append(tc)
+    return result
+
+
+def measure(fn, posts):
+    samples = []
+    matched = 0
+    for tag_ids in posts:
+        start = time.perf_counter()
+        matched += len(fn(tag_ids))
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return {
+        "mean": statistics.fmean(samples),
+        "p50": samples[len(samples) // 2],
+        "p99": samples[min(len(samples) - 1, int(len(samples) * 0.99))],
+        "matched": matched / len(posts),
+    }
+
+
+def report(name, stats):
+    print(f"{name:>8}: mean={stats['mean']:.3f} ms  p50={stats['p50']:.3f} ms  "
+          f"p99={stats['p99']:.3f} ms  совпадений={stats['matched']:.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--targets", type=int, default=10_000)
+    parser.add_argument("--tags", type=int, default=21)
+    parser.add_argument("--tags-per-target", type=int, default=2)
+    parser.add_argument("--posts", type=int, default=1_000)
+    parser.add_argument("--legacy", action="store_true",
+                        help="также замерить прежний построчный перебор")
+    args = parser.parse_args()
+
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    Session = sessionmaker(bind=engine)
+
+    rnd = random.Random(7)
+    posts = [rnd.sample(range(1, args.tags + 1), rnd.randint(1, 3))
+             for _ in range(args.posts)]
+
+    with Session() as session:
+        populate(session, args.targets, args.tags, args.tags_per_target)
+
+        index = RoutingIndex()
+        start = time.perf_counter()
+        index.build(session)
+        print(f"Индекс на {len(index)} таргет-каналов построен за "
+              f"{(time.perf_counter() - start) * 1000:.1f} ms")
+
+        report("index", measure(index.match, posts))
+
+        if args.legacy:
+            report("legacy", measure(lambda t: legacy_match(session, t),
+                                     posts[:5]))
+
+
+if __name__ == "__main__":
+    main()
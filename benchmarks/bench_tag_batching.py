@@ -0,0 +1,72 @@
+"""
+Пропускная способность предсказания тегов: одиночные запросы
+против микропакетов. Поднимает text_generate.stub_server в процессе.
+
+Запуск: python -m benchmarks.bench_tag_batching [--posts 500]
+"""
+import argparse
+import asyncio
+import time
+
+from aiohttp import web
+
+from text_generate.stub_server import make_app
+from text_generate.tag_predictor import AsyncTagPredictClient
+
+TAGS = ["Политика", "Экономика", "Технологии", "Спорт", "Наука", "Кино"]
+
+
+async def run_case(name, client, posts, single):
+    start = time.perf_counter()
+    if single:
+        jobs = [client.predict_tags(f"пост {i}", TAGS) for i in range(posts)]
+    else:
+        jobs = [client.predict_tags_batched(f"пост {i}", TAGS)
+                for i in range(posts)]
+    await asyncio.gather(*jobs)
+    elapsed = time.perf_counter() - start
+    print(f"{name:>18}: {posts} постов за {elapsed:.2f} s "
+          f"({posts / elapsed:.0f} постов/с)")
+
+
+async def serve(app, port):
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", port).start()
+    return runner
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--posts", type=int, default=500)
+    parser.add_argument("--port", type=int, default=5057)
+    parser.add_argument("--batch-size", type=int, default=16)
+    parser.add_argument("--batch-window", type=float, default=0.05)
+    args = parser.parse_args()
+
+    base = f"http://127.0.0.1:{args.port}"
+
+    for batch_route in (True, False):
+        app = make_app(batch=batch_route)
+        runner = await serve(app, args.port)
+        client = AsyncTagPredictClient(
+            url=f"{base}/predict_tags", batch_url=f"{base}/predict_tags_batch",
+            batch_size=args.batch_size, batch_window=args.batch_window)
+        try:
+            if batch_route:
+                await run_case("одиночные", client, args.posts, single=True)
+                await run_case("микропакеты", client, args.posts, single=False)
+            else:
+                await run_case("без batch-маршрута", client, args.posts,
+                               single=False)
+            print(f"{'':>18}  запросов к модели: {app['stats']['requests']}")
+        finally:
+            await runner.cleanup()
+
+    for endpoint, stats in client.transport.stats().items():
+        print(f"{endpoint}: {stats}")
+    await client.transport.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
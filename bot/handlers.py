@@ -33,8 +33,9 @@ from bot.interface.targets import (
 )
 from client.client_manager import get_user_client
 from bot.bot_instance import dp
-from db.utils import (
-    add_channel, fetch_channel_title, remove_tag_from_target_channel,
+from db.utils import fetch_channel_title
+from db.aio import (
+    add_channel, remove_tag_from_target_channel,
     add_tag_to_target_channel, get_target_channels,
     get_tags_for_target_channel, get_all_tags, get_or_create_user,
     get_rewrite_prompt, set_rewrite_prompt, set_include_image,
@@ -51,7 +52,7 @@ from aiogram.types import (
 async def handle_callback(query: CallbackQuery, state: FSMContext):
     data = query.data
     telegram_id = query.from_user.id
-    user = get_or_create_user(telegram_id)
+    user = await get_or_create_user(telegram_id)
     print(data)
 
     if data == "menu_main":
@@ -133,7 +134,7 @@ async def handle_callback(query: CallbackQuery, state: FSMContext):
 @dp.message(Command("set_include_image"))
 async def cmd_set_include_image(message: Message):
     telegram_id = message.from_user.id
-    user = get_or_create_user(telegram_id)
+    user = await get_or_create_user(telegram_id)
 
     args = message.text.split()
     if len(args) < 3:
@@ -147,7 +148,7 @@ async def cmd_set_include_image(message: Message):
         await message.answer("⚠️ Неверный формат!")
         return
 
-    if set_include_image(chat_id, user.id, include):
+    if await set_include_image(chat_id, user.id, include):
         await message.answer(
             f"✅ Настройка изображения для {chat_id} установлена: {'да' if include else 'нет'}.")
     else:
@@ -157,7 +158,7 @@ async def cmd_set_include_image(message: Message):
 @dp.message(Command("get_include_image"))
 async def cmd_get_include_image(message: Message):
     telegram_id = message.from_user.id
-    user = get_or_create_user(telegram_id)
+    user = await get_or_create_user(telegram_id)
 
     args = message.text.split()
     if len(args) < 2:
@@ -170,7 +171,7 @@ async def cmd_get_include_image(message: Message):
         await message.answer("⚠️ Неверный формат chat_id!")
         return
 
-    include = get_include_image(chat_id, user.id)
+    include = await get_include_image(chat_id, user.id)
     if include is None:
         await message.answer("❌ Канал не найден или не принадлежит вам.")
     elif include:
@@ -184,7 +185,7 @@ async def cmd_get_include_image(message: Message):
 @dp.message(Command("set_image_prompt"))
 async def cmd_set_image_prompt(message: Message):
     telegram_id = message.from_user.id
-    user = get_or_create_user(telegram_id)
+    user = await get_or_create_user(telegram_id)
 
     args = message.text.split(maxsplit=2)
     if len(args) < 3:
@@ -198,7 +199,7 @@ async def cmd_set_image_prompt(message: Message):
         await message.answer("⚠️ Неверный формат chat_id!")
         return
 
-    if set_image_prompt(chat_id, user.id, prompt):
+    if await set_image_prompt(chat_id, user.id, prompt):
         await message.answer(f"✅ Промт для генерации изображения установлен.")
     else:
         await message.answer("❌ Канал не найден.")
@@ -207,7 +208,7 @@ async def cmd_set_image_prompt(message: Message):
 @dp.message(Command("get_image_prompt"))
 async def cmd_get_image_prompt(message: Message):
     telegram_id = message.from_user.id
-    user = get_or_create_user(telegram_id)
+    user = await get_or_create_user(telegram_id)
 
     args = message.text.split()
     if len(args) < 2:
@@ -220,7 +221,7 @@ async def cmd_get_image_prompt(message: Message):
         await message.answer("⚠️ Неверный формат chat_id!")
         return
 
-    prompt = get_image_prompt(chat_id, user.id)
+    prompt = await get_image_prompt(chat_id, user.id)
     if prompt:
         await message.answer(
             f"🖼 Промт изображения для канала {chat_id}:\n\n{prompt}")
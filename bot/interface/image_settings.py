@@ -2,7 +2,7 @@ from aiogram.types import CallbackQuery, InlineKeyboardButton, InlineKeyboardMar
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import StatesGroup, State
 
-from db.utils import get_target_channels, get_or_create_user, get_image_prompt, set_image_prompt, get_include_image, set_include_image
+from db.aio import get_target_channels, get_or_create_user, get_image_prompt, set_image_prompt, get_include_image, set_include_image
 from bot.bot_instance import dp
 
 
@@ -23,7 +23,7 @@ async def handle_menu_images(query: CallbackQuery):
 
 
 async def handle_image_list(query: CallbackQuery, user):
-    channels = get_target_channels(user.id)
+    channels = await get_target_channels(user.id)
     if not channels:
         await query.message.edit_text("❌ Нет доступных каналов.", reply_markup=get_image_menu())
         await query.answer()
@@ -42,10 +42,10 @@ async def handle_image_list(query: CallbackQuery, user):
 
 async def handle_image_config(query: CallbackQuery | Message, user, data: str):
     chat_id = int(data.replace("image_config_", ""))
-    prompt = get_image_prompt(chat_id, user.id)
-    include = get_include_image(chat_id, user.id)
+    prompt = await get_image_prompt(chat_id, user.id)
+    include = await get_include_image(chat_id, user.id)
 
-    title = next((ch.title for ch in get_target_channels(user.id) if ch.chat_id == chat_id), "Без названия")
+    title = next((ch.title for ch in await get_target_channels(user.id) if ch.chat_id == chat_id), "Без названия")
     text = f"🖼 Настройки генерации для `{chat_id}` — *{title}*:\n\n"
     text += f"• Генерация: {'✅ ВКЛ' if include else '🚫 ВЫКЛ'}\n"
     text += f"• Промт: {prompt or 'ℹ️ Не задан'}"
@@ -80,13 +80,13 @@ async def handle_image_prompt_set(query: CallbackQuery, state: FSMContext, data:
 @dp.message(ImageFSM.waiting_prompt)
 async def process_image_prompt(message: Message, state: FSMContext):
     telegram_id = message.from_user.id
-    user = get_or_create_user(telegram_id)
+    user = await get_or_create_user(telegram_id)
 
     data = await state.get_data()
     chat_id = data.get("image_chat_id")
     prompt = message.text.strip()
 
-    if set_image_prompt(chat_id, user.id, prompt):
+    if await set_image_prompt(chat_id, user.id, prompt):
         await message.answer(f"✅ Промт установлен для `{chat_id}`.", parse_mode="Markdown")
         await handle_image_config(message, user, f"image_config_{chat_id}")
     else:
@@ -96,8 +96,8 @@ async def process_image_prompt(message: Message, state: FSMContext):
 
 async def handle_image_toggle(query: CallbackQuery, user, data: str):
     chat_id = int(data.replace("image_toggle_", ""))
-    current = get_include_image(chat_id, user.id)
-    success = set_include_image(chat_id, user.id, not current)
+    current = await get_include_image(chat_id, user.id)
+    success = await set_include_image(chat_id, user.id, not current)
 
     if success:
         await query.message.answer(f"🔁 Генерация {'включена' if not current else 'отключена'} для `{chat_id}`.", parse_mode="Markdown")
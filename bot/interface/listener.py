@@ -5,7 +5,7 @@ from aiogram.fsm.state import State, StatesGroup
 from aiogram.fsm.context import FSMContext
 
 from client.client_manager import start_user_client, get_user_client
-from db.utils import get_or_create_user, get_telegram_account, \
+from db.aio import get_or_create_user, get_telegram_account, \
     set_telegram_account
 from bot.bot_instance import dp
 
@@ -36,7 +36,7 @@ async def cmd_set_listener(message: Message):
         return
     print(1)
     telegram_id = message.from_user.id
-    user = get_or_create_user(telegram_id)
+    user = await get_or_create_user(telegram_id)
     print(1)
     try:
         api_id = int(args[1])
@@ -46,7 +46,7 @@ async def cmd_set_listener(message: Message):
         await message.answer("⚠️ Неверный формат данных.")
         return
     print(1)
-    set_telegram_account(user.id, api_id, api_hash, phone)
+    await set_telegram_account(user.id, api_id, api_hash, phone)
     print(1)
     try:
         result = await start_user_client(user.id)
@@ -63,8 +63,8 @@ async def cmd_set_listener(message: Message):
 @dp.message(Command("get_listener"))
 async def cmd_get_listener(message: Message):
     telegram_id = message.from_user.id
-    user = get_or_create_user(telegram_id)
-    account = get_telegram_account(user.id)
+    user = await get_or_create_user(telegram_id)
+    account = await get_telegram_account(user.id)
     if not account:
         await message.answer("❌ Слушатель не настроен.")
         return
@@ -104,7 +104,7 @@ async def cmd_get_listener(message: Message):
 @dp.message(Command("code"))
 async def cmd_code(message: Message):
     telegram_id = message.from_user.id
-    user = get_or_create_user(telegram_id)
+    user = await get_or_create_user(telegram_id)
     code = message.text.split(maxsplit=1)[1] if len(
         message.text.split()) > 1 else None
 
@@ -147,13 +147,13 @@ async def set_api_hash(message: Message, state: FSMContext):
 async def set_phone(message: Message, state: FSMContext):
     phone = message.text.strip()
     telegram_id = message.from_user.id
-    user = get_or_create_user(telegram_id)
+    user = await get_or_create_user(telegram_id)
 
     data = await state.get_data()
     api_id = data.get("api_id")
     api_hash = data.get("api_hash")
 
-    set_telegram_account(user.id, api_id, api_hash, phone)
+    await set_telegram_account(user.id, api_id, api_hash, phone)
 
     try:
         result = await start_user_client(user.id)
@@ -175,7 +175,7 @@ async def set_phone(message: Message, state: FSMContext):
 async def set_auth_code(message: Message, state: FSMContext):
     code = message.text.strip()
     telegram_id = message.from_user.id
-    user = get_or_create_user(telegram_id)
+    user = await get_or_create_user(telegram_id)
 
     try:
         result = await start_user_client(user.id, code=code)
@@ -215,7 +215,7 @@ async def handle_listener_set(query: CallbackQuery, state: FSMContext):
 
 
 async def handle_listener_show(query: CallbackQuery, user):
-    account = get_telegram_account(user.id)
+    account = await get_telegram_account(user.id)
     client = get_user_client(user.id)
 
     if not account:
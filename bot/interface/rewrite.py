@@ -2,7 +2,7 @@ from aiogram.types import CallbackQuery, InlineKeyboardButton, InlineKeyboardMar
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import StatesGroup, State
 
-from db.utils import get_target_channels, get_or_create_user, get_rewrite_prompt, set_rewrite_prompt
+from db.aio import get_target_channels, get_or_create_user, get_rewrite_prompt, set_rewrite_prompt
 from bot.bot_instance import dp
 
 class RewriteFSM(StatesGroup):
@@ -23,7 +23,7 @@ async def handle_menu_rewrite(query: CallbackQuery):
 
 
 async def handle_rewrite_list(query: CallbackQuery, user):
-    channels = get_target_channels(user.id)
+    channels = await get_target_channels(user.id)
     if not channels:
         await query.message.edit_text("❌ Нет доступных каналов.", reply_markup=get_rewrite_menu())
         await query.answer()
@@ -43,10 +43,10 @@ async def handle_rewrite_list(query: CallbackQuery, user):
 async def handle_rewrite_config(query: CallbackQuery | Message, user, data: str):
     print("handle_rewrite_config")
     chat_id = int(data.replace("rewrite_config_", ""))
-    prompt = get_rewrite_prompt(chat_id, user.id)
+    prompt = await get_rewrite_prompt(chat_id, user.id)
 
     channel = next(
-        (ch for ch in get_target_channels(user.id) if ch.chat_id == chat_id),
+        (ch for ch in await get_target_channels(user.id) if ch.chat_id == chat_id),
         None)
     title = channel.title if channel and channel.title else "Без названия"
     text = f"📜 Текущий промт для `{chat_id}` — *{title}*:\n\n"
@@ -89,12 +89,12 @@ async def handle_rewrite_set(query: CallbackQuery, state: FSMContext, data: str)
 async def process_new_prompt(message: Message, state: FSMContext):
     print("process_new_prompt")
     telegram_id = message.from_user.id
-    user = get_or_create_user(telegram_id)
+    user = await get_or_create_user(telegram_id)
     data = await state.get_data()
     chat_id = data.get("chat_id")
     prompt = message.text.strip()
 
-    if set_rewrite_prompt(chat_id, user.id, prompt):
+    if await set_rewrite_prompt(chat_id, user.id, prompt):
         # 1. Уведомление об успешной установке
         await message.answer(f"✅ Промт установлен для канала `{chat_id}`.", parse_mode="Markdown")
 
@@ -108,7 +108,7 @@ async def process_new_prompt(message: Message, state: FSMContext):
 
 async def handle_rewrite_clear(query: CallbackQuery, user, data: str):
     chat_id = int(data.replace("rewrite_clear_", ""))
-    set_rewrite_prompt(chat_id, user.id, "")
+    await set_rewrite_prompt(chat_id, user.id, "")
 
     # 1. Отправляем сообщение об очистке
     await query.message.answer(
@@ -3,10 +3,11 @@ from aiogram.types import CallbackQuery, InlineKeyboardMarkup, \
 from aiogram.fsm.context import FSMContext
 
 from client.client_manager import get_user_client
-from db.utils import get_active_channels, add_channel, fetch_channel_title, \
-    get_or_create_user
+from db.aio import get_active_channels, add_channel, get_or_create_user
+from db.utils import fetch_channel_title
 from client.listeners import remove_channel_listener, add_channel_listener
-from db.utils import remove_channel_by_id
+from client.pool import listener_pool
+from db.aio import remove_channel_by_id
 from aiogram.fsm.state import State, StatesGroup
 from bot.bot_instance import dp
 
@@ -34,7 +35,7 @@ async def handle_menu_sources(query: CallbackQuery):
 
 
 async def handle_source_list(query: CallbackQuery, user):
-    channels = get_active_channels(user.id)
+    channels = await get_active_channels(user.id)
     if not channels:
         text = "❌ Нет активных источников."
     else:
@@ -65,7 +66,7 @@ async def handle_source_add(query: CallbackQuery, state: FSMContext):
 
 
 async def handle_source_remove(query: CallbackQuery, user):
-    channels = get_active_channels(user.id)
+    channels = await get_active_channels(user.id)
     if not channels:
         await query.message.edit_text("❌ Нет источников для удаления.",
                                       reply_markup=get_sources_menu())
@@ -93,10 +94,13 @@ async def handle_source_delete_by_id(query: CallbackQuery, user, data: str):
         await query.answer("⚠️ Неверный chat_id")
         return
 
-    remove_channel_by_id(chat_id, user.id)
-    await remove_channel_listener(chat_id)
+    await remove_channel_by_id(chat_id, user.id)
+    if listener_pool.enabled:
+        await listener_pool.unsubscribe(chat_id, user.id)
+    else:
+        await remove_channel_listener(chat_id, user.id)
 
-    channels = get_active_channels(user.id)
+    channels = await get_active_channels(user.id)
     if not channels:
         await query.message.edit_text(
             "✅ Канал удалён.\n❌ Больше нет активных источников.",
@@ -120,14 +124,18 @@ async def handle_source_delete_by_id(query: CallbackQuery, user, data: str):
 @dp.message(SourceAddState.waiting_for_chat_id)
 async def process_chat_id_input(message: Message, state: FSMContext):
     telegram_id = message.from_user.id
-    user = get_or_create_user(telegram_id)
+    user = await get_or_create_user(telegram_id)
     try:
         chat_id = int(message.text.strip())
     except ValueError:
         await message.answer("⚠️ Неверный формат. Введите числовой ID канала.")
         return
 
-    client = get_user_client(user.id)
+    # В режиме пула канал проверяет и слушает аккаунт пула
+    if listener_pool.enabled:
+        client = listener_pool.pick(chat_id)
+    else:
+        client = get_user_client(user.id)
     if not client:
         await message.answer(
             "⚠️ Слушатель не активен. Сначала установите слушателя")
@@ -135,17 +143,32 @@ async def process_chat_id_input(message: Message, state: FSMContext):
         return
 
     try:
+        if listener_pool.enabled:
+            await listener_pool.join(chat_id, client)
         me = await client.get_me()
         await client.get_permissions(chat_id, me.id)
     except Exception:
+        if listener_pool.enabled:
+            await listener_pool.release(chat_id, client)
         await message.answer(
             "❌ Не удалось проверить права. Убедитесь, что слушатель в этом канале.")
         await state.clear()
         return
 
     title = await fetch_channel_title(chat_id, client)
-    if add_channel(chat_id, user.id, title):
-        await add_channel_listener(chat_id, client)
+    try:
+        added = await add_channel(chat_id, user.id, title)
+        if added:
+            if listener_pool.enabled:
+                await listener_pool.subscribe(chat_id, user.id, client)
+            else:
+                await add_channel_listener(chat_id, client, user.id)
+    finally:
+        # Канал не добавлен — аккаунт пула не должен оставаться в нём
+        if listener_pool.enabled:
+            await listener_pool.release(chat_id, client)
+
+    if added:
         await message.answer(
             f"✅ Канал `{chat_id}` ({title}) добавлен!",
             reply_markup=get_sources_menu(),
@@ -4,10 +4,11 @@ from aiogram.types import CallbackQuery, InlineKeyboardMarkup, \
 from aiogram.fsm.context import FSMContext
 
 from bot.bot_instance import dp
-from db.utils import (
+from db.aio import (
     get_all_tags, get_target_channels,
     get_tags_for_target_channel, remove_tag_from_target_channel,
-    get_or_create_user, add_tag_to_target_channel
+    get_or_create_user, add_tag_to_target_channel,
+    add_tag_id_to_target_channel
 )
 
 
@@ -37,7 +38,7 @@ async def handle_menu_tags(query: CallbackQuery):
 
 
 async def handle_tags_all(query: CallbackQuery):
-    tags = get_all_tags()
+    tags = await get_all_tags()
     if not tags:
         text = "❌ Нет тегов."
     else:
@@ -48,7 +49,7 @@ async def handle_tags_all(query: CallbackQuery):
 
 
 async def handle_tags_of_channel(query: CallbackQuery, user):
-    channels = get_target_channels(user.id)
+    channels = await get_target_channels(user.id)
     if not channels:
         current_text = query.message.text or ""
         new_text = "❌ Нет доступных каналов."
@@ -82,7 +83,7 @@ async def handle_tags_show_channel(query: CallbackQuery, user, data: str):
         await query.answer("⚠️ Неверный chat_id.")
         return
 
-    tags = get_tags_for_target_channel(chat_id, user.id)
+    tags = await get_tags_for_target_channel(chat_id, user.id)
     tags_text = "\n".join(
         f"• {tag.name}" for tag in tags) if tags else "Нет тегов."
 
@@ -112,14 +113,14 @@ async def handle_tag_add_start(query: CallbackQuery, state: FSMContext,
     await state.update_data(tag_op_chat_id=chat_id)
 
     telegram_id = query.from_user.id
-    user = get_or_create_user(telegram_id)
+    user = await get_or_create_user(telegram_id)
 
     # Получаем уже добавленные теги
-    existing_tags = get_tags_for_target_channel(chat_id, user.id)
+    existing_tags = await get_tags_for_target_channel(chat_id, user.id)
     existing_tag_ids = {tag.id for tag in existing_tags}
 
     # Получаем все теги и фильтруем
-    all_tags = get_all_tags()
+    all_tags = await get_all_tags()
     available_tags = [tag for tag in all_tags if tag.id not in existing_tag_ids]
 
     if not available_tags:
@@ -159,32 +160,15 @@ async def handle_tag_pick(query: CallbackQuery, user, data: str):
         await query.answer()
         return
 
-    from db.session import Session
-    from db.models import TargetChannel, TargetChannelTag, Tag
-
-    with Session() as session:
-        target = session.query(TargetChannel).filter_by(
-            chat_id=chat_id, user_id=user.id
-        ).first()
-        tag = session.query(Tag).filter_by(id=tag_id).first()
-
-        if not target or not tag:
-            await query.message.answer("❌ Канал или тег не найден.")
-            return
-
-        exists = session.query(TargetChannelTag).filter_by(
-            target_channel_id=target.id, tag_id=tag.id
-        ).first()
-        if exists:
-            await query.message.answer("⚠️ Тег уже добавлен.")
-            await show_channel_tags(chat_id, user, query.message)
-            return
-
-        # Сохраняем имя до выхода из сессии
-        tag_name = tag.name
-
-        session.add(TargetChannelTag(target_channel_id=target.id, tag_id=tag.id))
-        session.commit()
+    status, tag_name = await add_tag_id_to_target_channel(chat_id, user.id,
+                                                          tag_id)
+    if status == 'not_found':
+        await query.message.answer("❌ Канал или тег не найден.")
+        return
+    if status == 'exists':
+        await query.message.answer("⚠️ Тег уже добавлен.")
+        await show_channel_tags(chat_id, user, query.message)
+        return
 
     # 1. Сообщение об успешном добавлении
     await query.message.answer(
@@ -202,7 +186,7 @@ async def handle_tag_pick(query: CallbackQuery, user, data: str):
 
 async def handle_tag_remove_start(query: CallbackQuery, user, data: str):
     chat_id = int(data.replace("tag_remove_", ""))
-    tags = get_tags_for_target_channel(chat_id, user.id)
+    tags = await get_tags_for_target_channel(chat_id, user.id)
 
     if not tags:
         await query.message.edit_text("❌ У канала нет тегов.",
@@ -236,7 +220,7 @@ async def handle_tag_delete(query: CallbackQuery, user, data: str):
         await query.answer()
         return
 
-    if remove_tag_from_target_channel(chat_id, user.id, tag_name):
+    if await remove_tag_from_target_channel(chat_id, user.id, tag_name):
         # 1. Отправляем сообщение об удалении
         await query.message.answer(
             f"🗑 Тег `{tag_name}` удалён у канала `{chat_id}`.",
@@ -282,9 +266,9 @@ async def handle_tag_list(message: Message, state: FSMContext):
         return
 
     telegram_id = message.from_user.id
-    user = get_or_create_user(telegram_id)
+    user = await get_or_create_user(telegram_id)
 
-    tags = get_tags_for_target_channel(chat_id, user.id)
+    tags = await get_tags_for_target_channel(chat_id, user.id)
     if not tags:
         text = "❌ У канала нет тегов."
     else:
@@ -311,10 +295,10 @@ async def handle_remove_tag(message: Message, state: FSMContext):
     chat_id = data.get("tag_op_chat_id")
 
     telegram_id = message.from_user.id
-    user = get_or_create_user(telegram_id)
+    user = await get_or_create_user(telegram_id)
 
     tag_name = message.text.strip()
-    if remove_tag_from_target_channel(chat_id, user.id, tag_name):
+    if await remove_tag_from_target_channel(chat_id, user.id, tag_name):
         await message.answer(
             f"🗑 Тег `{tag_name}` удалён у канала `{chat_id}`.",
             parse_mode="Markdown"
@@ -326,7 +310,7 @@ async def handle_remove_tag(message: Message, state: FSMContext):
 
 
 async def show_channel_tags(chat_id: int, user, message_or_query):
-    tags = get_tags_for_target_channel(chat_id, user.id)
+    tags = await get_tags_for_target_channel(chat_id, user.id)
     tags_text = "\n".join(
         f"• {tag.name}" for tag in tags) if tags else "Нет тегов."
 
@@ -1,9 +1,10 @@
 from aiogram.types import CallbackQuery, InlineKeyboardMarkup, \
     InlineKeyboardButton, Message
 from aiogram.fsm.context import FSMContext
-from db.utils import get_target_channels, remove_target_channel, \
+from db.aio import get_target_channels, remove_target_channel, \
     add_target_channel, get_or_create_user
 from client.client_manager import get_user_client
+from client.pool import listener_pool
 from db.utils import fetch_channel_title
 from aiogram.fsm.state import State, StatesGroup
 from bot.bot_instance import dp
@@ -22,6 +23,16 @@ def get_target_channels_menu():
     ])
 
 
+def _listener_client(chat_id, user_id):
+    """
+    Клиент для запроса названия канала. В режиме пула запущены только
+    аккаунты пула, поэтому берём один из них.
+    """
+    if listener_pool.enabled:
+        return listener_pool.pick(chat_id)
+    return get_user_client(user_id)
+
+
 async def handle_menu_targets(query: CallbackQuery):
     await query.message.edit_text("🎯 Работа с таргетными каналами:",
                                   reply_markup=get_target_channels_menu())
@@ -29,7 +40,7 @@ async def handle_menu_targets(query: CallbackQuery):
 
 
 async def handle_target_list(query: CallbackQuery, user):
-    channels = get_target_channels(user.id)
+    channels = await get_target_channels(user.id)
     if not channels:
         text = "❌ Нет таргетных каналов."
     else:
@@ -56,7 +67,7 @@ async def handle_target_add(query: CallbackQuery, state: FSMContext):
 
 
 async def handle_target_remove_menu(query: CallbackQuery, user):
-    channels = get_target_channels(user.id)
+    channels = await get_target_channels(user.id)
     if not channels:
         await query.message.edit_text("❌ Нет каналов для удаления.",
                                       reply_markup=get_target_channels_menu())
@@ -79,7 +90,7 @@ async def handle_target_remove_menu(query: CallbackQuery, user):
 
 async def handle_target_remove_by_id(query: CallbackQuery, user, data: str):
     chat_id = int(data.replace("remove_target_", ""))
-    remove_target_channel(chat_id, user.id)
+    await remove_target_channel(chat_id, user.id)
     await query.message.edit_text("✅ Канал удалён.",
                                   reply_markup=get_target_channels_menu())
     await query.answer()
@@ -92,14 +103,14 @@ async def handle_target_add_from_input(message, state: FSMContext, user):
         await message.answer("⚠️ Неверный формат chat_id.")
         return
 
-    client = get_user_client(user.id)
+    client = _listener_client(chat_id, user.id)
     if not client:
         await message.answer("⚠️ Слушатель не активен.")
         await state.clear()
         return
 
     title = await fetch_channel_title(chat_id, client)
-    if add_target_channel(chat_id, user.id, title=title):
+    if await add_target_channel(chat_id, user.id, title=title):
         await message.answer(
             f"✅ Таргетный канал `{chat_id}` ({title}) добавлен.",
             reply_markup=get_target_channels_menu(), parse_mode="Markdown")
@@ -113,7 +124,7 @@ async def handle_target_add_from_input(message, state: FSMContext, user):
 @dp.message(TargetChannelSetup.waiting_chat_id)
 async def add_target_channel_fsm(message: Message, state: FSMContext):
     telegram_id = message.from_user.id
-    user = get_or_create_user(telegram_id)
+    user = await get_or_create_user(telegram_id)
 
     try:
         chat_id = int(message.text.strip())
@@ -121,7 +132,7 @@ async def add_target_channel_fsm(message: Message, state: FSMContext):
         await message.answer("⚠️ Неверный формат chat_id.")
         return
 
-    client = get_user_client(user.id)
+    client = _listener_client(chat_id, user.id)
     if not client:
         await message.answer("⚠️ Слушатель не активен.")
         await state.clear()
@@ -129,7 +140,7 @@ async def add_target_channel_fsm(message: Message, state: FSMContext):
 
     title = await fetch_channel_title(chat_id, client)
 
-    if add_target_channel(chat_id, user.id, title=title):
+    if await add_target_channel(chat_id, user.id, title=title):
         await message.answer(
             f"✅ Таргетный канал `{chat_id}` ({title}) добавлен.",
             reply_markup=get_target_channels_menu(), parse_mode="Markdown")
@@ -1,50 +1,264 @@
-import os
+import asyncio
+import random
+import time
 
 from telethon import TelegramClient
-from telethon.errors import SessionPasswordNeededError, PhoneCodeExpiredError
+from telethon.errors import SessionPasswordNeededError, PhoneCodeExpiredError, \
+    AuthKeyUnregisteredError, AuthKeyDuplicatedError, SessionRevokedError, \
+    UserDeactivatedError, UserDeactivatedBanError
+from telethon.tl.functions.updates import GetStateRequest
 
-from client.constants import SESSIONS_DIR
-from db.utils import get_telegram_account, get_active_channels, \
-    get_session_file_path
-from client.listeners import add_channel_listener
+from client.constants import CLIENT_HEALTH_INTERVAL, CLIENT_PROBE_TIMEOUT, \
+    CLIENT_RECONNECT_BACKOFF, CLIENT_RECONNECT_MAX_BACKOFF, PENDING_LOGIN_TTL
+from db.aio import get_telegram_account, get_active_channels
+from db.utils import get_session_file_path
+from client.listeners import add_channel_listener, move_client_listeners, \
+    drop_client_listeners
 
 _clients = {}  # user_id -> TelegramClient (авторизованные)
 _pending_clients = {}  # user_id -> TelegramClient (ждущие код)
+_status = {}  # user_id -> ClientStatus
+_supervisors = {}  # user_id -> задача надзора за клиентом
+_login_expiry = {}  # user_id -> задача истечения незавершённого входа
+_retired = set()  # user_id, чьи клиенты отказали и сняты с подписок
+
+# Сессия отозвана или аккаунт удалён: переподключаться бессмысленно
+FATAL_AUTH_ERRORS = (AuthKeyUnregisteredError, AuthKeyDuplicatedError,
+                     SessionRevokedError, UserDeactivatedError,
+                     UserDeactivatedBanError)
+
+
+class ClientStatus:
+    """Состояние клиента пользователя для get_client_status."""
+
+    def __init__(self, user_id, session_name):
+        self.user_id = user_id
+        self.session_name = session_name
+        self.state = 'starting'  # starting/awaiting_code/connected/reconnecting/failed/stopped
+        self.since = time.time()
+        self.last_probe = None
+        self.probe_failures = 0
+        self.reconnects = 0
+        self.last_error = None
+
+    def set(self, state, error=None):
+        if state != self.state:
+            self.state = state
+            self.since = time.time()
+        if error is not None:
+            self.last_error = error
+
+    def as_dict(self) -> dict:
+        return {
+            "user_id": self.user_id,
+            "state": self.state,
+            "since": self.since,
+            "last_probe": self.last_probe,
+            "probe_failures": self.probe_failures,
+            "reconnects": self.reconnects,
+            "last_error": self.last_error,
+        }
+
+
+def _cancel_task(tasks, user_id):
+    task = tasks.pop(user_id, None)
+    if task is not None and task is not asyncio.current_task():
+        task.cancel()
+
+
+async def _disconnect(client):
+    try:
+        await client.disconnect()
+    except Exception as e:
+        print(f"⚠️ Ошибка при отключении клиента: {e}")
+
+
+async def _expire_pending(user_id, client):
+    await asyncio.sleep(PENDING_LOGIN_TTL)
+    if _pending_clients.get(user_id) is client:
+        del _pending_clients[user_id]
+        _login_expiry.pop(user_id, None)
+        await _disconnect(client)
+        if user_id not in _clients:
+            _status[user_id].set('stopped', "код подтверждения не введён")
+        print(f"⌛ Вход для user_id={user_id} не завершён, клиент отключён.")
+
+
+async def _reconnect(user_id, client, status):
+    delay = CLIENT_RECONNECT_BACKOFF
+    while True:
+        try:
+            await _disconnect(client)
+            await client.connect()
+            if not await client.is_user_authorized():
+                status.set('failed', "сессия больше не авторизована")
+                return False
+            status.reconnects += 1
+            status.set('connected')
+            print(f"🔌 Клиент user_id={user_id} переподключён.")
+            return True
+        except FATAL_AUTH_ERRORS as e:
+            status.set('failed', str(e))
+            return False
+        except Exception as e:
+            status.set('reconnecting', str(e))
+            await asyncio.sleep(random.uniform(delay / 2, delay))
+            delay = min(delay * 2, CLIENT_RECONNECT_MAX_BACKOFF)
+
+
+async def _supervise(user_id, client):
+    """
+    Периодически проверяет связь клиента и переподключает его с
+    экспоненциальной задержкой. Обработчики событий остаются на том же
+    объекте клиента, поэтому подписки переживают переподключение.
+    """
+    status = _status[user_id]
+    while True:
+        await asyncio.sleep(CLIENT_HEALTH_INTERVAL)
+        try:
+            if not client.is_connected():
+                raise ConnectionError("соединение потеряно")
+            await asyncio.wait_for(client(GetStateRequest()),
+                                   CLIENT_PROBE_TIMEOUT)
+            status.last_probe = time.time()
+            status.probe_failures = 0
+            status.set('connected')
+            continue
+        except FATAL_AUTH_ERRORS as e:
+            status.set('failed', str(e))
+        except Exception as e:
+            status.probe_failures += 1
+            status.set('reconnecting', str(e) or type(e).__name__)
+            print(f"⚠️ Клиент user_id={user_id} не отвечает: {status.last_error}")
+            if await _reconnect(user_id, client, status):
+                continue
+
+        print(f"❌ Клиент user_id={user_id} остановлен: {status.last_error}")
+        _supervisors.pop(user_id, None)
+        await _retire(user_id, client)
+        return
+
+
+async def _retire(user_id, client):
+    """
+    Убирает отказавший клиент: его каналы переходят к следующим клиентам
+    (или к другим аккаунтам пула), чтобы не замолчать для подписчиков.
+    """
+    from client.pool import listener_pool
+
+    if _clients.get(user_id) is client:
+        del _clients[user_id]
+    _retired.add(user_id)
+    dropped = drop_client_listeners(client)
+    await listener_pool.remove_client(client, dropped)
+    await _disconnect(client)
+
+
+async def _restore_listeners(user_id, client):
+    """Возвращает подписки клиенту, который вошёл заново после отказа."""
+    from client.pool import listener_pool
+
+    if listener_pool.enabled:
+        if user_id in listener_pool.account_ids:
+            listener_pool.add_client(client)
+        return
+    for channel in await get_active_channels(user_id):
+        await add_channel_listener(channel.chat_id, client, user_id)
+
+
+def _supervise_client(user_id, client):
+    _cancel_task(_supervisors, user_id)
+    _supervisors[user_id] = asyncio.create_task(_supervise(user_id, client))
 
 
 async def start_user_client(user_id, code=None):
-    account = get_telegram_account(user_id)
+    account = await get_telegram_account(user_id)
     if not account:
         raise RuntimeError("Telegram account not found")
 
-    session_path = get_session_file_path(account.session_name)
-    client = TelegramClient(
-        session_path,
-        account.api_id,
-        account.api_hash,
-        system_version="4.16.30-vxTEST"
-    )
-    await client.connect()
+    status = _status.get(user_id)
+    current = _clients.get(user_id)
+    # Клиент этой же сессии уже работает или переподключается под надзором —
+    # второй клиент на том же файле сессии не создаём
+    if current is not None and status is not None and \
+            status.session_name == account.session_name and \
+            status.state in ('connected', 'reconnecting'):
+        return 'ok'
+
+    pending = _pending_clients.pop(user_id, None)
+    if code is not None and pending is not None:
+        client = pending
+    else:
+        if pending is not None:
+            _cancel_task(_login_expiry, user_id)
+            await _disconnect(pending)
+        session_path = get_session_file_path(account.session_name)
+        client = TelegramClient(
+            session_path,
+            account.api_id,
+            account.api_hash,
+            system_version="4.16.30-vxTEST"
+        )
+        await client.connect()
+
+    status = _status.setdefault(user_id,
+                                ClientStatus(user_id, account.session_name))
+    status.session_name = account.session_name
+
     if not await client.is_user_authorized():
         if code is None:
-            await client.send_code_request(account.phone)
+            try:
+                await client.send_code_request(account.phone)
+            except Exception:
+                await _disconnect(client)
+                raise
             _pending_clients[user_id] = client
+            _login_expiry[user_id] = asyncio.create_task(
+                _expire_pending(user_id, client))
+            if current is None:
+                status.set('awaiting_code')
             return 'awaiting_code'
 
+        if pending is None:
+            # Ожидающий вход уже истёк: без phone_code_hash код не принять
+            await _disconnect(client)
+            raise RuntimeError("⌛ Время ввода кода истекло. Запросите новый код.")
+
         try:
-            client = _pending_clients.pop(user_id, client)
             await client.sign_in(account.phone, code)
         except PhoneCodeExpiredError:
+            await _disconnect(client)
             raise RuntimeError("❌ Код подтверждения просрочен или заблокирован. "
                                "Возможно, вы попытались авторизовать тот же аккаунт, с которого пишете в бота. "
                                "Пожалуйста, используйте другой Telegram-аккаунт.")
         except SessionPasswordNeededError:
+            await _disconnect(client)
             raise RuntimeError("🔐 Аккаунт требует пароль (2FA), пока не поддерживается.")
         except Exception as e:
+            # Неверный код можно ввести ещё раз тем же клиентом, пока
+            # вход не истёк
+            expiry = _login_expiry.get(user_id)
+            if expiry is not None and not expiry.done():
+                _pending_clients[user_id] = client
+            else:
+                await _disconnect(client)
             raise RuntimeError(f"Ошибка входа с кодом: {e}")
 
-    # Успешная авторизация
+    # Успешная авторизация: прежний клиент заменяется и отключается,
+    # его подписки переходят к новому
+    _cancel_task(_login_expiry, user_id)
+    if current is not None and current is not client:
+        from client.pool import listener_pool
+
+        move_client_listeners(current, client)
+        listener_pool.replace_client(current, client)
+        await _disconnect(current)
+    elif user_id in _retired:
+        _retired.discard(user_id)
+        await _restore_listeners(user_id, client)
     _clients[user_id] = client
+    status.set('connected')
+    _supervise_client(user_id, client)
 
     print(f"✅ Клиент для user_id={user_id} запущен.")
     return 'ok'
@@ -58,11 +272,46 @@ def is_user_pending(user_id):
     return user_id in _pending_clients
 
 
+def get_client_status(user_id=None):
+    """
+    Состояние клиента пользователя или, без user_id, всех клиентов.
+    """
+    if user_id is not None:
+        status = _status.get(user_id)
+        return status.as_dict() if status else None
+    return {uid: status.as_dict() for uid, status in _status.items()}
+
+
+def client_stats() -> dict:
+    states = {}
+    for status in _status.values():
+        states[status.state] = states.get(status.state, 0) + 1
+    return {
+        "clients": len(_clients),
+        "pending_logins": len(_pending_clients),
+        "reconnects": sum(s.reconnects for s in _status.values()),
+        "states": states,
+    }
+
+
 async def stop_user_client(user_id):
     """
     Остановить и удалить клиент пользователя (если понадобится).
     """
+    _cancel_task(_supervisors, user_id)
+    _cancel_task(_login_expiry, user_id)
+    pending = _pending_clients.pop(user_id, None)
+    if pending:
+        await _disconnect(pending)
     client = _clients.pop(user_id, None)
     if client:
-        await client.disconnect()
+        await _disconnect(client)
         print(f"🛑 Клиент для user_id={user_id} остановлен.")
+    if user_id in _status:
+        _status[user_id].set('stopped')
+
+
+async def stop_all_clients():
+    """Останавливает надзор и отключает все клиенты при завершении."""
+    user_ids = set(_clients) | set(_pending_clients) | set(_supervisors)
+    await asyncio.gather(*(stop_user_client(user_id) for user_id in user_ids))
@@ -1 +1,22 @@
-SESSIONS_DIR = "sessions"
\ No newline at end of file
+import os
+
+SESSIONS_DIR = "sessions"
+
+# Сколько Telegram-клиентов подключается одновременно при старте
+CLIENT_STARTUP_CONCURRENCY = 10
+
+# Общий пул слушателей: user_id владельцев аккаунтов через запятую.
+# Если задан, каналы-источники всех пользователей слушают только эти
+# аккаунты, а клиенты остальных пользователей при старте не поднимаются.
+LISTENER_POOL_ACCOUNTS = [
+    int(user_id) for user_id in
+    os.getenv("LISTENER_POOL_ACCOUNTS", "").split(",") if user_id.strip()
+]
+
+# Надзор за клиентами: период проверки связи и её таймаут (сек),
+# задержки переподключения и время жизни незавершённого входа по коду
+CLIENT_HEALTH_INTERVAL = 60
+CLIENT_PROBE_TIMEOUT = 15
+CLIENT_RECONNECT_BACKOFF = 2
+CLIENT_RECONNECT_MAX_BACKOFF = 300
+PENDING_LOGIN_TTL = 600
@@ -1,62 +1,128 @@
+import time
+
 from bot.bot_instance import bot
-from db.utils import save_post, post_to_target_channels, assign_tags_to_post, \
-    get_allowed_target_channels, rewrite_text_if_needed, \
-    generate_image_if_needed, send_to_channel
-from db.session import Session
-from db.models import Channel, PostTag, Tag
+from db.utils import save_post, assign_tags_to_post, \
+    get_allowed_target_channels
+from db.aio import get_channel_title, find_saved_post, start_job, \
+    mark_job_routed, mark_target, finish_job
+from db.routing_index import routing_index
+from pipeline.config import SEND_PRIORITY_DEFAULT, SEND_PRIORITY_RESUMED
+from pipeline.dedup import duplicate_detector
+from pipeline.fanout import fanout
+from pipeline.ingest import IngestEvent, ingest_queue
+from metrics.registry import metrics, current_source
+
+
+async def global_handler(event, owners: frozenset):
+    """
+    Обработчик Telethon: только ставит сообщение в очередь обработки,
+    чтобы не задерживать разбор обновлений клиента. owners — пользователи,
+    подписанные на канал: пост уходит только в их таргет-каналы.
+    """
+    await ingest_queue.put(IngestEvent(
+        chat_id=event.chat_id,
+        message_id=event.id,
+        text=event.raw_text,
+        sender_id=event.sender_id,
+        owners=owners,
+    ))
+
+
+async def process_post(record: IngestEvent):
+    token = current_source.set(record.chat_id)
+    try:
+        metrics.observe("ingest", time.monotonic() - record.received_at)
+        await _process_post(record)
+    finally:
+        current_source.reset(token)
 
 
-async def global_handler(event):
-    text = event.raw_text
-    sender = await event.get_sender()
+async def _process_post(record: IngestEvent):
+    text = record.text
+
+    # 0. Отсекаем повторы до любых обращений к моделям. Почти одинаковый
+    # пост остаётся тем владельцам, которым похожий ещё не приходил
+    if not record.resumed:
+        duplicate, owners = duplicate_detector.check(
+            record.chat_id, record.message_id, text, record.owners)
+        if duplicate:
+            print(f"♻️ Дубль ({duplicate}) сообщения {record.message_id} из {record.chat_id} "
+                  f"пропущен, всего пропущено: {duplicate_detector.suppressed}")
+            return
+        record.owners = owners
 
     # Получаем название канала
-    with Session() as session:
-        channel = session.query(Channel).filter_by(chat_id=event.chat_id).first()
-        channel_title = channel.title if channel and channel.title else "Неизвестный канал"
+    channel_title = await get_channel_title(record.chat_id) or "Неизвестный канал"
 
-    print(f"\n📥 Новое сообщение от {sender.id if sender else 'Неизвестно'} в {channel_title} (ID {event.chat_id}):\n{text}\n{'-' * 40}")
+    print(f"\n📥 Новое сообщение от {record.sender_id or 'Неизвестно'} в {channel_title} (ID {record.chat_id}):\n{text}\n{'-' * 40}")
 
     try:
-        post_id = await save_post(
-            message_id=event.id,
-            chat_id=event.chat_id,
-            text=text
-        )
-        print("✅ Сообщение сохранено в БД.")
-
-        # 2. Определяем теги через модель
-        await assign_tags_to_post(post_id, text)
-
-        with Session() as session:
-            post_tags = session.query(PostTag).filter_by(post_id=post_id).all()
-            tag_ids = [pt.tag_id for pt in post_tags]
-            tags = session.query(Tag).filter(Tag.id.in_(tag_ids)).all()
-            tag_names = [tag.name for tag in tags]
-
-        tags_text = ", ".join(tag_names) if tag_names else "Нет тегов"
-        print(f"🏷 Определены теги: {tags_text}")
-
-        # 3. Получаем подходящие таргет-каналы
-        target_channels = get_allowed_target_channels(post_id)
-        if not target_channels:
-            print("⚠️ Нет подходящих таргетных каналов.")
+        # 1. Задание в БД: по нему обработка продолжится после перезапуска
+        with metrics.timer("job"):
+            job_id, status, pending = await start_job(
+                record.chat_id, record.message_id, text, record.sender_id)
+        if pending is None:
+            print(f"⏭ Задание {job_id} уже в статусе {status}, пропускаем.")
             return
 
-        # 4. Генерация для каждого таргетного канала
-        for channel in target_channels:
-            rewrite_prompt = (channel.rewrite_prompt or "").strip()
-            image_prompt = (channel.image_prompt or "").strip()
-            include_image = bool(channel.include_image)
+        if status == 'routed':
+            # Пост уже сохранён и размечен — досылаем в оставшиеся каналы
+            target_channels = routing_index.get(pending)
+            print(f"🔁 Задание {job_id}: осталось каналов {len(target_channels)}")
+        else:
+            target_channels = await route_post(record, job_id)
 
-            try:
-                rewritten_text = await rewrite_text_if_needed(text, rewrite_prompt)
-                image_data = await generate_image_if_needed(text, image_prompt) if include_image else None
+        if not target_channels:
+            await finish_job(job_id)
+            return
 
-                await send_to_channel(bot, channel.chat_id, channel.title, rewritten_text, image_data)
+        async def on_result(channel, ok, error):
+            await mark_target(job_id, channel.id, ok, error)
 
-            except Exception as e:
-                print(f"❌ Ошибка при обработке канала {channel.chat_id}: {e}")
+        # 4. Генерация и отправка во все таргетные каналы параллельно
+        priority = SEND_PRIORITY_RESUMED if record.resumed \
+            else SEND_PRIORITY_DEFAULT
+        delivered = await fanout.deliver(bot, target_channels, text, on_result,
+                                         priority)
+        await finish_job(job_id)
+        print(f"📦 Обработано каналов: {delivered}/{len(target_channels)}")
 
     except Exception as e:
-        print(f"⚠️ Ошибка в global_handler: {e}")
+        print(f"⚠️ Ошибка в process_post: {e}")
+
+
+async def route_post(record: IngestEvent, job_id: int):
+    """
+    Сохраняет пост, определяет теги и таргет-каналы и фиксирует их в задании.
+    """
+    text = record.text
+    post = None
+    if record.resumed:
+        # До перезапуска буфер мог успеть записать пост — второй раз не пишем
+        post = await find_saved_post(record.chat_id, record.message_id)
+    if post is None:
+        with metrics.timer("persist"):
+            post = await save_post(
+                    message_id=record.message_id,
+                    chat_id=record.chat_id,
+                    text=text
+                )
+        print("✅ Сообщение поставлено в очередь записи.")
+
+    # 2. Определяем теги через модель
+    with metrics.timer("tag"):
+        assigned_tags = await assign_tags_to_post(post, text)
+
+    tags_text = ", ".join(assigned_tags.values()) if assigned_tags else "Нет тегов"
+    print(f"🏷 Определены теги: {tags_text}")
+
+    # 3. Получаем подходящие таргет-каналы
+    with metrics.timer("route"):
+        target_channels = get_allowed_target_channels(assigned_tags.keys(),
+                                                      record.owners)
+    with metrics.timer("job"):
+        await mark_job_routed(job_id,
+                              [channel.id for channel in target_channels])
+    if not target_channels:
+        print("⚠️ Нет подходящих таргетных каналов.")
+    return target_channels
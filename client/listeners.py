@@ -1,30 +1,175 @@
 from telethon import events
 
-from db.models import Channel
-from db.session import Session
+from db.aio import get_channel_title
 from .handlers import global_handler
 
-active_listeners = {}
 
+class SubscriptionRegistry:
+    """
+    Подписки пользователей на каналы-источники: (client, chat_id) -> множество
+    user_id. Канал слушается, пока на него подписан хотя бы один
+    пользователь. Если один канал слушают несколько клиентов, обновления
+    обрабатывает только первый из них (ведущий), а пост уходит всем
+    подписанным пользователям.
+    """
 
-async def add_channel_listener(chat_id, client):
-    if chat_id in active_listeners:
+    def __init__(self):
+        self._subs = {}  # (client, chat_id) -> set(user_id)
+        self._clients_of = {}  # chat_id -> [client], первый — ведущий
+
+    def add(self, client, chat_id, user_id) -> bool:
+        """Возвращает True, если клиент начал слушать канал."""
+        key = (client, chat_id)
+        users = self._subs.get(key)
+        if users is not None:
+            users.add(user_id)
+            return False
+        self._subs[key] = {user_id}
+        self._clients_of.setdefault(chat_id, []).append(client)
+        return True
+
+    def remove(self, chat_id, user_id, client=None) -> list:
+        """
+        Отписывает пользователя от канала (на всех клиентах или на одном).
+        Возвращает клиентов, которым канал больше не нужен.
+        """
+        released = []
+        for listener in list(self._clients_of.get(chat_id, ())):
+            if client is not None and listener is not client:
+                continue
+            users = self._subs[(listener, chat_id)]
+            users.discard(user_id)
+            if not users:
+                del self._subs[(listener, chat_id)]
+                self._clients_of[chat_id].remove(listener)
+                released.append(listener)
+        if not self._clients_of.get(chat_id, True):
+            del self._clients_of[chat_id]
+        return released
+
+    def move(self, old, new) -> list:
+        """
+        Переносит подписки со старого клиента на новый, сохраняя его место
+        в очереди ведущих. Возвращает перенесённые chat_id.
+        """
+        moved = [chat_id for client, chat_id in self._subs if client is old]
+        for chat_id in moved:
+            users = self._subs.pop((old, chat_id))
+            clients = self._clients_of[chat_id]
+            if (new, chat_id) in self._subs:
+                self._subs[(new, chat_id)].update(users)
+                clients.remove(old)
+            else:
+                self._subs[(new, chat_id)] = users
+                clients[clients.index(old)] = new
+        return moved
+
+    def drop(self, client) -> dict:
+        """
+        Убирает все подписки клиента; ведущим по каждому каналу становится
+        следующий клиент. Возвращает chat_id -> user_id, которых он обслуживал.
+        """
+        dropped = {}
+        for chat_id in [chat_id for listener, chat_id in self._subs
+                        if listener is client]:
+            dropped[chat_id] = self._subs.pop((client, chat_id))
+            clients = self._clients_of[chat_id]
+            clients.remove(client)
+            if not clients:
+                del self._clients_of[chat_id]
+        return dropped
+
+    def is_primary(self, client, chat_id) -> bool:
+        clients = self._clients_of.get(chat_id)
+        return bool(clients) and clients[0] is client
+
+    def owners(self, chat_id) -> frozenset:
+        owners = set()
+        for client in self._clients_of.get(chat_id, ()):
+            owners.update(self._subs[(client, chat_id)])
+        return frozenset(owners)
+
+    def __contains__(self, key):
+        return key in self._subs
+
+    def __len__(self):
+        return len(self._subs)
+
+
+subscriptions = SubscriptionRegistry()
+
+
+class ClientDispatcher:
+    """
+    Единственный обработчик NewMessage на клиента. Подписка на канал —
+    это запись в множестве chats, поэтому стоимость обработки обновления
+    не зависит от числа подписок.
+    """
+
+    def __init__(self, client):
+        self.client = client
+        self.chats = set()
+        self._filter = events.NewMessage()
+        client.add_event_handler(self._on_message, self._filter)
+
+    async def _on_message(self, event):
+        chat_id = event.chat_id
+        if chat_id in self.chats and \
+                subscriptions.is_primary(self.client, chat_id):
+            await global_handler(event, subscriptions.owners(chat_id))
+
+    def detach(self):
+        self.client.remove_event_handler(self._on_message, self._filter)
+
+
+_dispatchers = {}  # TelegramClient -> ClientDispatcher
+
+
+def get_dispatcher(client) -> ClientDispatcher:
+    dispatcher = _dispatchers.get(client)
+    if dispatcher is None:
+        dispatcher = _dispatchers[client] = ClientDispatcher(client)
+    return dispatcher
+
+
+async def add_channel_listener(chat_id, client, user_id):
+    if not subscriptions.add(client, chat_id, user_id):
         return
 
-    with Session() as session:
-        channel = session.query(Channel).filter_by(chat_id=chat_id).first()
-        title = f" ({channel.title})" if channel and channel.title else ""
+    channel_title = await get_channel_title(chat_id)
+    title = f" ({channel_title})" if channel_title else ""
 
-    event_filter = events.NewMessage(chats=chat_id)
-    client.add_event_handler(global_handler, event_filter)
-    active_listeners[chat_id] = (client, event_filter)
+    get_dispatcher(client).chats.add(chat_id)
     print(f"➕ Подписка добавлена на {chat_id}{title}")
 
 
-async def remove_channel_listener(chat_id):
-    if chat_id not in active_listeners:
+def move_client_listeners(old, new):
+    """Переключает подписки клиента, заменённого после повторного входа."""
+    if old is new:
         return
+    moved = subscriptions.move(old, new)
+    dispatcher = _dispatchers.pop(old, None)
+    if dispatcher is not None:
+        dispatcher.detach()
+    if moved:
+        get_dispatcher(new).chats.update(moved)
+
+
+def drop_client_listeners(client) -> dict:
+    """Снимает подписки отказавшего клиента, см. SubscriptionRegistry.drop."""
+    dispatcher = _dispatchers.pop(client, None)
+    if dispatcher is not None:
+        dispatcher.detach()
+    return subscriptions.drop(client)
+
 
-    client, event_filter = active_listeners.pop(chat_id)
-    client.remove_event_handler(global_handler, event_filter)
-    print(f"➖ Подписка удалена с {chat_id}")
+async def remove_channel_listener(chat_id, user_id, client=None):
+    for listener in subscriptions.remove(chat_id, user_id, client):
+        dispatcher = _dispatchers.get(listener)
+        if dispatcher is None:
+            continue
+        dispatcher.chats.discard(chat_id)
+        if not dispatcher.chats:
+            dispatcher.detach()
+            del _dispatchers[listener]
+        print(f"➖ Подписка удалена с {chat_id}")
@@ -0,0 +1,135 @@
+import asyncio
+
+from telethon.tl.functions.channels import JoinChannelRequest, \
+    LeaveChannelRequest
+
+from client.client_manager import start_user_client, get_user_client
+from client.constants import LISTENER_POOL_ACCOUNTS
+from client.listeners import add_channel_listener, remove_channel_listener, \
+    subscriptions
+
+
+class ListenerPool:
+    """
+    Небольшой набор аккаунтов-слушателей, общий для всех пользователей.
+    Каждый канал-источник закреплён за одним аккаунтом пула, новые каналы
+    достаются наименее загруженному: аккаунт вступает в канал при
+    закреплении и выходит, когда от канала отписался последний
+    пользователь. Пост из канала уходит всем
+    подписанным пользователям через реестр подписок, поэтому число
+    клиентов и обновлений зависит от числа различных каналов, а не
+    пользователей.
+    """
+
+    def __init__(self, account_ids=LISTENER_POOL_ACCOUNTS):
+        self.account_ids = list(account_ids)
+        self._clients = []
+        self._load = {}  # client -> число закреплённых каналов
+        self._assigned = {}  # chat_id -> client
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.account_ids)
+
+    async def start(self):
+        results = await asyncio.gather(
+            *(start_user_client(user_id) for user_id in self.account_ids),
+            return_exceptions=True)
+        for user_id, result in zip(self.account_ids, results):
+            if result != 'ok':
+                print(f"⚠️ Аккаунт пула user_id={user_id} не запущен: {result}")
+                continue
+            client = get_user_client(user_id)
+            self._clients.append(client)
+            self._load.setdefault(client, 0)
+        print(f"🎧 Пул слушателей: {len(self._clients)}/"
+              f"{len(self.account_ids)} аккаунтов")
+
+    def add_client(self, client):
+        if client not in self._load:
+            self._clients.append(client)
+            self._load[client] = 0
+
+    def replace_client(self, old, new):
+        """Аккаунт пула перелогинился: каналы переходят к новому клиенту."""
+        if old not in self._load:
+            return
+        self._clients[self._clients.index(old)] = new
+        self._load[new] = self._load.pop(old)
+        for chat_id, client in self._assigned.items():
+            if client is old:
+                self._assigned[chat_id] = new
+
+    async def remove_client(self, client, dropped: dict):
+        """
+        Аккаунт пула отказал: его каналы заново распределяются между
+        остальными. dropped — chat_id -> user_id из drop_client_listeners.
+        """
+        if client not in self._load:
+            return
+        self._clients.remove(client)
+        del self._load[client]
+        for chat_id in [chat_id for chat_id, listener in self._assigned.items()
+                        if listener is client]:
+            del self._assigned[chat_id]
+        for chat_id, user_ids in dropped.items():
+            for user_id in user_ids:
+                try:
+                    await self.subscribe(chat_id, user_id)
+                except Exception as e:
+                    print(f"⚠️ Не удалось переназначить {chat_id}: {e}")
+
+    def pick(self, chat_id):
+        """Клиент, который слушает или будет слушать канал."""
+        client = self._assigned.get(chat_id)
+        if client is None and self._clients:
+            client = min(self._clients, key=self._load.__getitem__)
+        return client
+
+    async def join(self, chat_id, client):
+        """Вступает в канал, чтобы аккаунт получал его обновления."""
+        entity = await client.get_input_entity(chat_id)
+        await client(JoinChannelRequest(entity))
+
+    async def release(self, chat_id, client):
+        """
+        Выходит из канала, в который вступили для проверки, если канал
+        так и не закреплён за этим клиентом.
+        """
+        if self._assigned.get(chat_id) is not client:
+            await self._leave(chat_id, client)
+
+    async def _leave(self, chat_id, client):
+        try:
+            entity = await client.get_input_entity(chat_id)
+            await client(LeaveChannelRequest(entity))
+        except Exception as e:
+            print(f"⚠️ Аккаунт пула не смог выйти из {chat_id}: {e}")
+
+    async def subscribe(self, chat_id, user_id, client=None):
+        client = self._assigned.get(chat_id) or client or self.pick(chat_id)
+        if client is None:
+            raise RuntimeError("Пул слушателей пуст")
+        if chat_id not in self._assigned:
+            await self.join(chat_id, client)
+            self._assigned[chat_id] = client
+            self._load[client] += 1
+        await add_channel_listener(chat_id, client, user_id)
+
+    async def unsubscribe(self, chat_id, user_id):
+        await remove_channel_listener(chat_id, user_id)
+        client = self._assigned.get(chat_id)
+        if client is not None and (client, chat_id) not in subscriptions:
+            del self._assigned[chat_id]
+            self._load[client] -= 1
+            await self._leave(chat_id, client)
+
+    def stats(self) -> dict:
+        return {
+            "clients": len(self._clients),
+            "channels": len(self._assigned),
+            "max_channels_per_client": max(self._load.values(), default=0),
+        }
+
+
+listener_pool = ListenerPool()
@@ -0,0 +1,83 @@
+import asyncio
+import time
+
+from client.client_manager import start_user_client, get_user_client
+from client.constants import CLIENT_STARTUP_CONCURRENCY
+from client.listeners import add_channel_listener
+from client.pool import listener_pool
+from db.aio import get_all_users_with_accounts, get_active_channels, \
+    get_channel_subscriptions
+
+# user_id -> {"state": starting/ready/awaiting_code/failed, "seconds", "channels", "error"}
+client_readiness = {}
+
+
+async def _start_one(user_id, semaphore):
+    state = client_readiness[user_id] = {"state": "starting", "seconds": None,
+                                         "channels": 0, "error": None}
+    started = time.monotonic()
+    try:
+        async with semaphore:
+            result = await start_user_client(user_id)
+        if result != 'ok':
+            state["state"] = result
+            return
+
+        # Слушатели подключаются сразу, не дожидаясь остальных клиентов
+        client = get_user_client(user_id)
+        channels = await get_active_channels(user_id)
+        for channel in channels:
+            await add_channel_listener(channel.chat_id, client, user_id)
+        state["channels"] = len(channels)
+        state["state"] = "ready"
+        state["seconds"] = time.monotonic() - started
+        print(f"🟢 user_id={user_id} готов за {state['seconds']:.1f} с, "
+              f"каналов: {state['channels']}")
+    except Exception as e:
+        state["state"] = "failed"
+        state["error"] = str(e)
+        print(f"⚠️ Не удалось запустить клиента для user_id={user_id}: {e}")
+    finally:
+        state["seconds"] = time.monotonic() - started
+
+
+async def start_listener_pool():
+    """
+    Поднимает аккаунты пула и распределяет между ними все каналы-источники.
+    """
+    started = time.monotonic()
+    await listener_pool.start()
+    for chat_id, user_id in await get_channel_subscriptions():
+        try:
+            await listener_pool.subscribe(chat_id, user_id)
+        except Exception as e:
+            print(f"⚠️ Не удалось подписать пул на {chat_id}: {e}")
+    print(f"🚀 Пул слушателей готов за {time.monotonic() - started:.1f} с: "
+          f"{listener_pool.stats()}")
+
+
+async def start_all_user_clients(limit=CLIENT_STARTUP_CONCURRENCY):
+    """
+    Подключает клиентов всех пользователей параллельно, не больше limit
+    одновременно. Возвращает client_readiness. В режиме пула вместо
+    клиентов пользователей поднимаются только аккаунты пула.
+    """
+    if listener_pool.enabled:
+        await start_listener_pool()
+        return client_readiness
+
+    users = await get_all_users_with_accounts()
+    if not users:
+        print("❗️ Нет пользователей с Telegram-аккаунтами.")
+        return client_readiness
+
+    print(f"🔄 Инициализация Telegram-клиентов для пользователей: {len(users)}")
+    started = time.monotonic()
+    semaphore = asyncio.Semaphore(limit)
+    await asyncio.gather(*(_start_one(user.id, semaphore) for user in users))
+
+    ready = sum(1 for state in client_readiness.values()
+                if state["state"] == "ready")
+    print(f"🚀 Клиенты запущены за {time.monotonic() - started:.1f} с: "
+          f"готово {ready}/{len(users)}")
+    return client_readiness
@@ -0,0 +1,53 @@
+"""
+Асинхронные версии функций db.utils для вызова из корутин.
+Каждый вызов выполняется в потоке БД (db.worker) и не блокирует
+цикл событий aiogram и Telethon.
+"""
+import functools
+
+from . import jobs, utils, write_behind
+from .worker import run_db
+
+
+def _in_db_thread(func):
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        return await run_db(func, *args, **kwargs)
+
+    return wrapper
+
+
+get_channel_title = _in_db_thread(utils.get_channel_title)
+find_saved_post = _in_db_thread(write_behind.find_saved_post)
+get_active_channels = _in_db_thread(utils.get_active_channels)
+get_channel_owners = _in_db_thread(utils.get_channel_owners)
+get_channel_subscriptions = _in_db_thread(utils.get_channel_subscriptions)
+add_channel = _in_db_thread(utils.add_channel)
+remove_channel_by_id = _in_db_thread(utils.remove_channel_by_id)
+add_target_channel = _in_db_thread(utils.add_target_channel)
+remove_target_channel = _in_db_thread(utils.remove_target_channel)
+get_target_channels = _in_db_thread(utils.get_target_channels)
+add_tag_to_target_channel = _in_db_thread(utils.add_tag_to_target_channel)
+add_tag_id_to_target_channel = _in_db_thread(utils.add_tag_id_to_target_channel)
+remove_tag_from_target_channel = _in_db_thread(
+    utils.remove_tag_from_target_channel)
+get_tags_for_target_channel = _in_db_thread(utils.get_tags_for_target_channel)
+get_all_tags = _in_db_thread(utils.get_all_tags)
+get_or_create_user = _in_db_thread(utils.get_or_create_user)
+get_user = _in_db_thread(utils.get_user)
+set_rewrite_prompt = _in_db_thread(utils.set_rewrite_prompt)
+get_rewrite_prompt = _in_db_thread(utils.get_rewrite_prompt)
+set_telegram_account = _in_db_thread(utils.set_telegram_account)
+get_telegram_account = _in_db_thread(utils.get_telegram_account)
+get_all_users_with_accounts = _in_db_thread(utils.get_all_users_with_accounts)
+set_image_prompt = _in_db_thread(utils.set_image_prompt)
+get_image_prompt = _in_db_thread(utils.get_image_prompt)
+set_include_image = _in_db_thread(utils.set_include_image)
+get_include_image = _in_db_thread(utils.get_include_image)
+
+start_job = _in_db_thread(jobs.start_job)
+mark_job_routed = _in_db_thread(jobs.mark_job_routed)
+mark_target = _in_db_thread(jobs.mark_target)
+finish_job = _in_db_thread(jobs.finish_job)
+get_unfinished_jobs = _in_db_thread(jobs.get_unfinished_jobs)
+compact_jobs = _in_db_thread(jobs.compact_jobs)
@@ -0,0 +1,112 @@
+import datetime
+
+from .config import JOB_MAX_ATTEMPTS, JOB_RETENTION
+from .models import PostJob, PostJobTarget
+from .session import Session
+
+
+def start_job(chat_id, message_id, text, sender_id=None):
+    """
+    Создаёт задание для поста или берёт существующее и отмечает новую
+    попытку. Возвращает (job_id, status, pending_target_ids); для
+    завершённого или исчерпавшего попытки задания pending_target_ids — None.
+    """
+    with Session() as session:
+        job = session.query(PostJob).filter_by(chat_id=chat_id,
+                                               message_id=message_id).first()
+        if job is None:
+            job = PostJob(chat_id=chat_id, message_id=message_id, text=text,
+                          sender_id=sender_id, status='new', attempts=0)
+            session.add(job)
+            session.flush()
+
+        if job.status in ('done', 'failed'):
+            return job.id, job.status, None
+
+        if job.attempts >= JOB_MAX_ATTEMPTS:
+            job.status = 'failed'
+            session.commit()
+            return job.id, job.status, None
+
+        job.attempts += 1
+        pending = [t.target_channel_id for t in job.targets
+                   if t.status == 'pending']
+        result = job.id, job.status, pending
+        session.commit()
+        return result
+
+
+def mark_job_routed(job_id, target_channel_ids):
+    """
+    Фиксирует результат маршрутизации: по шагу на каждый таргет-канал.
+    Повторный вызов не создаёт дублей шагов.
+    """
+    with Session() as session:
+        job = session.get(PostJob, job_id)
+        existing = {t.target_channel_id for t in job.targets}
+        for target_channel_id in target_channel_ids:
+            if target_channel_id not in existing:
+                job.targets.append(PostJobTarget(
+                    target_channel_id=target_channel_id, status='pending'))
+        job.status = 'routed' if target_channel_ids else 'done'
+        session.commit()
+
+
+def mark_target(job_id, target_channel_id, sent: bool, error=None):
+    with Session() as session:
+        step = session.query(PostJobTarget).filter_by(
+            job_id=job_id, target_channel_id=target_channel_id).first()
+        if step is None or step.status == 'sent':
+            return
+        step.attempts += 1
+        if sent:
+            step.status = 'sent'
+            step.last_error = None
+        else:
+            step.last_error = error
+            if step.attempts >= JOB_MAX_ATTEMPTS:
+                step.status = 'failed'
+        session.commit()
+
+
+def finish_job(job_id):
+    """
+    Закрывает задание, если не осталось шагов в ожидании.
+    """
+    with Session() as session:
+        job = session.get(PostJob, job_id)
+        if job is None:
+            return
+        if all(t.status != 'pending' for t in job.targets):
+            job.status = 'done'
+            session.commit()
+
+
+def get_unfinished_jobs():
+    with Session() as session:
+        return [
+            (job.id, job.chat_id, job.message_id, job.text, job.sender_id)
+            for job in session.query(PostJob)
+            .filter(PostJob.status.in_(('new', 'routed')))
+            .order_by(PostJob.id)
+        ]
+
+
+def compact_jobs(retention=JOB_RETENTION):
+    """
+    Удаляет завершённые задания старше retention секунд.
+    """
+    border = datetime.datetime.utcnow() - datetime.timedelta(seconds=retention)
+    with Session() as session:
+        old = (session.query(PostJob.id)
+               .filter(PostJob.status.in_(('done', 'failed')),
+                       PostJob.updated_at < border))
+        old_ids = [job_id for (job_id,) in old]
+        if not old_ids:
+            return 0
+        session.query(PostJobTarget).filter(
+            PostJobTarget.job_id.in_(old_ids)).delete(synchronize_session=False)
+        session.query(PostJob).filter(
+            PostJob.id.in_(old_ids)).delete(synchronize_session=False)
+        session.commit()
+        return len(old_ids)
@@ -0,0 +1,117 @@
+from sqlalchemy import BigInteger, inspect, text
+
+from .models import Base
+
+# Дочерние таблицы, которые при слиянии дублей родителя переносятся на
+# оставшуюся строку: (таблица, внешний ключ, остальные столбцы ключа строки)
+_DEPENDENTS = {
+    'target_channels': [('target_channel_tags', 'target_channel_id', ['tag_id'])],
+}
+
+
+def _merge_dependents(conn, child, fk, key_columns, survivor_of):
+    """
+    Переносит дочерние строки на оставшихся родителей; строки, которые
+    после переноса повторили бы уже существующие, удаляются.
+    """
+    parents = set(survivor_of) | set(survivor_of.values())
+    ids = ", ".join(str(i) for i in parents)
+    cols = ", ".join([fk] + key_columns)
+    rows = conn.execute(text(f"SELECT id, {cols} FROM {child} "
+                             f"WHERE {fk} IN ({ids}) ORDER BY id")).all()
+
+    seen, dropped, moved = set(), [], []
+    # Сначала строки, уже принадлежащие оставшимся родителям
+    for row_id, parent_id, *rest in sorted(
+            rows, key=lambda r: (r[1] in survivor_of, r[0])):
+        target = survivor_of.get(parent_id, parent_id)
+        key = (target, *rest)
+        if key in seen:
+            dropped.append(row_id)
+            continue
+        seen.add(key)
+        if target != parent_id:
+            moved.append((row_id, target))
+
+    if dropped:
+        conn.execute(text(f"DELETE FROM {child} WHERE id IN "
+                          f"({', '.join(str(i) for i in dropped)})"))
+    for row_id, target in moved:
+        conn.execute(text(f"UPDATE {child} SET {fk} = :target WHERE id = :id"),
+                     {"target": target, "id": row_id})
+    if dropped or moved:
+        print(f"🧹 {child}: перенесено строк {len(moved)}, "
+              f"удалено повторов {len(dropped)} (id {dropped})")
+
+
+def _merge_duplicates(conn, table, columns):
+    """
+    Перед созданием уникального индекса оставляет по одной строке
+    (с минимальным id) на каждую комбинацию значений columns. Дочерние
+    строки дублей переносятся на оставшуюся строку.
+    """
+    cols = ", ".join(columns)
+    on = " AND ".join(f"t.{c} = d.{c}" for c in columns)
+    rows = conn.execute(text(
+        f"SELECT t.id, {', '.join('t.' + c for c in columns)} FROM {table} t "
+        f"JOIN (SELECT {cols} FROM {table} GROUP BY {cols} "
+        f"HAVING COUNT(*) > 1) d ON {on} ORDER BY t.id")).all()
+    if not rows:
+        return
+
+    survivors = {}
+    survivor_of = {}  # id дубля -> id оставшейся строки
+    for row_id, *key in rows:
+        survivor = survivors.setdefault(tuple(key), row_id)
+        if survivor != row_id:
+            survivor_of[row_id] = survivor
+
+    for child, fk, key_columns in _DEPENDENTS.get(table, []):
+        _merge_dependents(conn, child, fk, key_columns, survivor_of)
+
+    removed = sorted(survivor_of)
+    conn.execute(text(f"DELETE FROM {table} WHERE id IN "
+                      f"({', '.join(str(i) for i in removed)})"))
+    print(f"🧹 {table}: слиты дубли по ({cols}), удалены id {removed} "
+          f"(оставлены {sorted(set(survivor_of.values()))})")
+
+
+def _widen_columns(conn, inspector, table):
+    """
+    Расширяет до BIGINT столбцы, созданные как INTEGER до перехода на
+    BigInteger: id каналов (-100…) и пользователей Telegram не помещаются
+    в 32 бита. В SQLite INTEGER и так 64-битный.
+    """
+    if conn.dialect.name == 'sqlite':
+        return
+    existing = {column["name"]: column["type"]
+                for column in inspector.get_columns(table.name)}
+    for column in table.columns:
+        current = existing.get(column.name)
+        if (isinstance(column.type, BigInteger) and current is not None
+                and not isinstance(current, BigInteger)):
+            conn.execute(text(f"ALTER TABLE {table.name} ALTER COLUMN "
+                              f"{column.name} TYPE BIGINT"))
+            print(f"🧹 {table.name}.{column.name}: INTEGER -> BIGINT")
+
+
+def apply_migrations(engine):
+    """
+    Доводит существующую базу до текущих моделей: create_all не меняет
+    уже созданные таблицы, поэтому расширяем столбцы и создаём недостающие
+    индексы здесь. Дубли ищутся только перед созданием отсутствующего
+    уникального индекса.
+    """
+    with engine.begin() as conn:
+        inspector = inspect(conn)
+        for table in Base.metadata.sorted_tables:
+            _widen_columns(conn, inspector, table)
+            existing = {index["name"]
+                        for index in inspector.get_indexes(table.name)}
+            for index in table.indexes:
+                if index.name in existing:
+                    continue
+                if index.unique:
+                    _merge_duplicates(conn, table.name,
+                                      [c.name for c in index.columns])
+                index.create(conn)
@@ -1,5 +1,5 @@
-from sqlalchemy import Column, Integer, Text, TIMESTAMP, ForeignKey, \
-    UniqueConstraint
+from sqlalchemy import Column, Integer, BigInteger, Text, TIMESTAMP, \
+    ForeignKey, UniqueConstraint, Index
 from sqlalchemy.orm import declarative_base, relationship
 import datetime
 
@@ -9,19 +9,29 @@ Base = declarative_base()
 class Channel(Base):
     __tablename__ = 'channels_to_listen'
     id = Column(Integer, primary_key=True)
-    chat_id = Column(Integer, nullable=False)
+    chat_id = Column(BigInteger, nullable=False)
     title = Column(Text, nullable=True)
     user_id = Column(Integer, ForeignKey('users.id'), nullable=False)
 
+    __table_args__ = (
+        Index('ix_channels_chat_user', 'chat_id', 'user_id', unique=True),
+        Index('ix_channels_user', 'user_id'),
+    )
+
 
 class ParsedPost(Base):
     __tablename__ = 'parsed_posts'
     id = Column(Integer, primary_key=True)
     message_id = Column(Integer, nullable=False)
-    chat_id = Column(Integer, nullable=False)
+    chat_id = Column(BigInteger, nullable=False)
     text = Column(Text, nullable=False)
     ts = Column(TIMESTAMP, default=datetime.datetime.utcnow)
 
+    __table_args__ = (
+        Index('ix_parsed_posts_chat_message', 'chat_id', 'message_id'),
+        Index('ix_parsed_posts_ts', 'ts'),
+    )
+
 
 class Tag(Base):
     __tablename__ = 'tags'
@@ -35,11 +45,15 @@ class PostTag(Base):
     post_id = Column(Integer, ForeignKey('parsed_posts.id'), nullable=False)
     tag_id = Column(Integer, ForeignKey('tags.id'), nullable=False)
 
+    __table_args__ = (
+        Index('ix_post_tags_post_tag', 'post_id', 'tag_id', unique=True),
+    )
+
 
 class TargetChannel(Base):
     __tablename__ = 'target_channels'
     id = Column(Integer, primary_key=True)
-    chat_id = Column(Integer, nullable=False)
+    chat_id = Column(BigInteger, nullable=False)
     title = Column(Text, nullable=True)
     user_id = Column(Integer, ForeignKey('users.id'), nullable=False)
     rewrite_prompt = Column(Text, nullable=True)
@@ -52,6 +66,12 @@ class TargetChannel(Base):
         cascade="all, delete-orphan"
     )
 
+    __table_args__ = (
+        Index('ix_target_channels_chat_user', 'chat_id', 'user_id',
+              unique=True),
+        Index('ix_target_channels_user', 'user_id'),
+    )
+
 
 class TargetChannelTag(Base):
     __tablename__ = 'target_channel_tags'
@@ -61,13 +81,14 @@ class TargetChannelTag(Base):
     tag_id = Column(Integer, ForeignKey('tags.id'), nullable=False)
 
     __table_args__ = (UniqueConstraint('target_channel_id', 'tag_id',
-                                       name='_target_channel_tag_uc'),)
+                                       name='_target_channel_tag_uc'),
+                      Index('ix_target_channel_tags_tag', 'tag_id'))
 
 
 class User(Base):
     __tablename__ = 'users'
     id = Column(Integer, primary_key=True)
-    telegram_id = Column(Integer, unique=True, nullable=False)
+    telegram_id = Column(BigInteger, unique=True, nullable=False)
 
 
 class TelegramAccount(Base):
@@ -82,3 +103,49 @@ class TelegramAccount(Base):
     session_name = Column(Text, nullable=True)
 
     user = relationship("User", backref="telegram_account")
+
+
+class PostJob(Base):
+    """
+    Задание на обработку входящего поста. Переживает перезапуск:
+    незавершённые задания возобновляются при старте.
+    """
+    __tablename__ = 'post_jobs'
+    id = Column(Integer, primary_key=True)
+    chat_id = Column(BigInteger, nullable=False)
+    message_id = Column(Integer, nullable=False)
+    text = Column(Text, nullable=False)
+    sender_id = Column(BigInteger, nullable=True)
+    status = Column(Text, nullable=False, default='new')  # new/routed/done/failed
+    attempts = Column(Integer, nullable=False, default=0)
+    created_at = Column(TIMESTAMP, default=datetime.datetime.utcnow)
+    updated_at = Column(TIMESTAMP, default=datetime.datetime.utcnow,
+                        onupdate=datetime.datetime.utcnow)
+
+    targets = relationship(
+        "PostJobTarget",
+        backref="job",
+        cascade="all, delete-orphan"
+    )
+
+    __table_args__ = (
+        Index('ix_post_jobs_chat_message', 'chat_id', 'message_id',
+              unique=True),
+        Index('ix_post_jobs_status', 'status', 'updated_at'),
+    )
+
+
+class PostJobTarget(Base):
+    """Шаг задания: доставка поста в один таргет-канал."""
+    __tablename__ = 'post_job_targets'
+    id = Column(Integer, primary_key=True)
+    job_id = Column(Integer, ForeignKey('post_jobs.id'), nullable=False)
+    target_channel_id = Column(Integer, nullable=False)
+    status = Column(Text, nullable=False, default='pending')  # pending/sent/failed
+    attempts = Column(Integer, nullable=False, default=0)
+    last_error = Column(Text, nullable=True)
+
+    __table_args__ = (
+        Index('ix_post_job_targets_job_target', 'job_id', 'target_channel_id',
+              unique=True),
+    )
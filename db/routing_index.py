@@ -0,0 +1,118 @@
+import threading
+from dataclasses import dataclass
+
+from .models import TargetChannel, TargetChannelTag
+
+
+@dataclass(frozen=True)
+class RoutedTarget:
+    """
+    Снимок настроек таргет-канала, достаточный для маршрутизации поста
+    без обращения к БД.
+    """
+    id: int
+    chat_id: int
+    user_id: int
+    title: str | None
+    rewrite_prompt: str | None
+    include_image: int
+    image_prompt: str | None
+
+    @classmethod
+    def from_model(cls, tc: TargetChannel) -> "RoutedTarget":
+        return cls(
+            id=tc.id,
+            chat_id=tc.chat_id,
+            user_id=tc.user_id,
+            title=tc.title,
+            rewrite_prompt=tc.rewrite_prompt,
+            include_image=tc.include_image or 0,
+            image_prompt=tc.image_prompt,
+        )
+
+
+class RoutingIndex:
+    """
+    Инвертированный индекс tag_id -> таргет-каналы.
+    Строится один раз при старте и поддерживается мутаторами из db.utils.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._targets = {}  # target_channel_id -> RoutedTarget
+        self._by_tag = {}  # tag_id -> set(target_channel_id)
+        self._tags_of = {}  # target_channel_id -> set(tag_id)
+
+    def build(self, session):
+        targets = session.query(TargetChannel).all()
+        links = session.query(TargetChannelTag.target_channel_id,
+                               TargetChannelTag.tag_id).all()
+
+        with self._lock:
+            self._targets = {tc.id: RoutedTarget.from_model(tc)
+                             for tc in targets}
+            self._by_tag = {}
+            self._tags_of = {tc_id: set() for tc_id in self._targets}
+            for tc_id, tag_id in links:
+                if tc_id not in self._targets:
+                    continue
+                self._by_tag.setdefault(tag_id, set()).add(tc_id)
+                self._tags_of[tc_id].add(tag_id)
+
+    def upsert_target(self, tc: TargetChannel):
+        target = RoutedTarget.from_model(tc)
+        with self._lock:
+            self._targets[target.id] = target
+            self._tags_of.setdefault(target.id, set())
+
+    def remove_target(self, target_channel_id: int):
+        with self._lock:
+            self._targets.pop(target_channel_id, None)
+            for tag_id in self._tags_of.pop(target_channel_id, set()):
+                bucket = self._by_tag.get(tag_id)
+                if bucket is None:
+                    continue
+                bucket.discard(target_channel_id)
+                if not bucket:
+                    del self._by_tag[tag_id]
+
+    def add_tag(self, target_channel_id: int, tag_id: int):
+        with self._lock:
+            if target_channel_id not in self._targets:
+                return
+            self._by_tag.setdefault(tag_id, set()).add(target_channel_id)
+            self._tags_of[target_channel_id].add(tag_id)
+
+    def remove_tag(self, target_channel_id: int, tag_id: int):
+        with self._lock:
+            bucket = self._by_tag.get(tag_id)
+            if bucket is not None:
+                bucket.discard(target_channel_id)
+                if not bucket:
+                    del self._by_tag[tag_id]
+            tags = self._tags_of.get(target_channel_id)
+            if tags is not None:
+                tags.discard(tag_id)
+
+    def match(self, tag_ids) -> list[RoutedTarget]:
+        """
+        Таргет-каналы, у которых есть хотя бы один из тегов поста.
+        Стоимость — O(число тегов поста + число совпадений).
+        """
+        with self._lock:
+            matched = set()
+            for tag_id in tag_ids:
+                matched.update(self._by_tag.get(tag_id, ()))
+            return [self._targets[tc_id] for tc_id in sorted(matched)]
+
+    def get(self, target_channel_ids) -> list[RoutedTarget]:
+        """Таргет-каналы по id; удалённые с тех пор пропускаются."""
+        with self._lock:
+            return [self._targets[tc_id] for tc_id in sorted(target_channel_ids)
+                    if tc_id in self._targets]
+
+    def __len__(self):
+        return len(self._targets)
+
+
+routing_index = RoutingIndex()
@@ -1,5 +1,45 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
 from sqlalchemy.orm import sessionmaker
 
-engine = create_engine('sqlite:///data.db', echo=False)
-Session = sessionmaker(bind=engine)
\ No newline at end of file
+from .config import DATABASE_URL, SQLITE_JOURNAL_MODE, SQLITE_SYNCHRONOUS, \
+    SQLITE_CACHE_SIZE_KB, SQLITE_BUSY_TIMEOUT_MS, POOL_SIZE, MAX_OVERFLOW, \
+    POOL_RECYCLE
+
+
+def _apply_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    cursor.execute(f"PRAGMA journal_mode={SQLITE_JOURNAL_MODE}")
+    cursor.execute(f"PRAGMA synchronous={SQLITE_SYNCHRONOUS}")
+    cursor.execute(f"PRAGMA cache_size=-{SQLITE_CACHE_SIZE_KB}")
+    cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.close()
+
+
+def create_db_engine(url=DATABASE_URL):
+    """
+    Движок с профилем под выбранную СУБД: для SQLite — WAL и прагмы,
+    для остальных (PostgreSQL) — пул с проверкой соединений.
+    """
+    url = make_url(url)
+    if url.get_backend_name() != "sqlite":
+        return create_engine(url, echo=False, pool_size=POOL_SIZE,
+                             max_overflow=MAX_OVERFLOW, pool_pre_ping=True,
+                             pool_recycle=POOL_RECYCLE)
+
+    kwargs = {
+        # Соединения используют поток БД и основной поток при старте
+        "connect_args": {"check_same_thread": False,
+                         "timeout": SQLITE_BUSY_TIMEOUT_MS / 1000},
+    }
+    if url.database and url.database != ":memory:":
+        kwargs.update(pool_size=POOL_SIZE, max_overflow=MAX_OVERFLOW)
+
+    engine = create_engine(url, echo=False, **kwargs)
+    event.listen(engine, "connect", _apply_sqlite_pragmas)
+    return engine
+
+
+engine = create_db_engine()
+Session = sessionmaker(bind=engine)
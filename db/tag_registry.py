@@ -0,0 +1,51 @@
+import threading
+
+from .models import Tag
+from .session import Session
+
+
+class TagRegistry:
+    """
+    Словарь тегов в памяти процесса: name <-> id.
+    Загружается один раз и сбрасывается при добавлении тегов.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._by_name = None
+        self._by_id = None
+
+    def load(self):
+        with Session() as session:
+            rows = session.query(Tag.id, Tag.name).all()
+        with self._lock:
+            self._by_id = {tag_id: name for tag_id, name in rows}
+            self._by_name = {name: tag_id for tag_id, name in rows}
+
+    def invalidate(self):
+        with self._lock:
+            self._by_name = None
+            self._by_id = None
+
+    def _ensure_loaded(self):
+        if self._by_name is None:
+            self.load()
+
+    def names(self) -> list[str]:
+        self._ensure_loaded()
+        return list(self._by_name)
+
+    def resolve(self, names) -> dict[int, str]:
+        """
+        Переводит имена тегов в словарь tag_id -> имя, пропуская неизвестные.
+        """
+        self._ensure_loaded()
+        by_name = self._by_name
+        return {by_name[name]: name for name in names if name in by_name}
+
+    def name_of(self, tag_id: int) -> str | None:
+        self._ensure_loaded()
+        return self._by_id.get(tag_id)
+
+
+tag_registry = TagRegistry()
@@ -1,19 +1,28 @@
 import asyncio
 import base64
+import io
 import os
-import tempfile
 import time
 
 from aiogram import Bot
 from PIL import Image
-from aiogram.types import FSInputFile
+from aiogram.exceptions import TelegramBadRequest
 from client.constants import SESSIONS_DIR
 from img_generate.img_generator import FusionBrainAPI
+from img_generate.generated_image import GeneratedImage
+from img_generate.file_id_cache import file_id_cache
 from text_generate.tag_predictor import tag_predict_client
 from text_generate.text_rewriter import rewrite_client
-from .models import Channel, ParsedPost, Tag, PostTag, Base, TargetChannelTag, \
+from text_generate.rewrite_cache import rewrite_cache
+from pipeline.config import SEND_PRIORITY_DEFAULT
+from pipeline.send_scheduler import send_scheduler
+from .models import Channel, Tag, Base, TargetChannelTag, \
     TargetChannel, User, TelegramAccount
 from .session import Session
+from .migrations import apply_migrations
+from .routing_index import routing_index
+from .tag_registry import tag_registry
+from .write_behind import post_buffer, PendingPost
 import random
 
 fusion_api = FusionBrainAPI()
@@ -21,7 +30,11 @@ fusion_api = FusionBrainAPI()
 
 def init_db():
     Base.metadata.create_all(bind=Session.kw["bind"])
+    apply_migrations(Session.kw["bind"])
     preload_tags()
+    tag_registry.load()
+    with Session() as session:
+        routing_index.build(session)
 
 
 def preload_tags():
@@ -37,24 +50,21 @@ def preload_tags():
             for name in default_tags:
                 session.add(Tag(name=name))
             session.commit()
+            tag_registry.invalidate()
 
 
 async def predict_tags_async(text: str) -> list:
-    from .models import Tag
-    from .session import Session
-    import asyncio
-
-    with Session() as session:
-        all_tags = session.query(Tag).all()
-        tag_names = [t.name for t in all_tags]
+    predicted_tag_names = await tag_predict_client.predict_tags_batched(
+        text, tag_registry.names())
 
-    def task():
-        return tag_predict_client.predict_tags(text, tag_names)
+    return [Tag(id=tag_id, name=name) for tag_id, name in
+            tag_registry.resolve(predicted_tag_names).items()]
 
-    predicted_tag_names = await asyncio.to_thread(task)
 
+def get_channel_title(chat_id):
     with Session() as session:
-        return session.query(Tag).filter(Tag.name.in_(predicted_tag_names)).all()
+        channel = session.query(Channel).filter_by(chat_id=chat_id).first()
+        return channel.title if channel else None
 
 
 def get_active_channels(user_id: int = None):
@@ -72,6 +82,20 @@ def get_active_channels(user_id: int = None):
     return list(unique.values())
 
 
+def get_channel_owners(chat_id) -> frozenset:
+    """Пользователи, у которых канал добавлен как источник."""
+    with Session() as session:
+        return frozenset(
+            user_id for (user_id,) in
+            session.query(Channel.user_id).filter_by(chat_id=chat_id))
+
+
+def get_channel_subscriptions():
+    """Все пары (chat_id, user_id) каналов-источников."""
+    with Session() as session:
+        return session.query(Channel.chat_id, Channel.user_id).all()
+
+
 def add_channel(chat_id, user_id, title=None):
     with Session() as session:
         if session.query(Channel).filter_by(chat_id=chat_id,
@@ -91,29 +115,27 @@ def remove_channel_by_id(chat_id, user_id):
             session.commit()
 
 
-async def save_post(message_id, chat_id, text):
-    with Session() as session:
-        post = ParsedPost(message_id=message_id, chat_id=chat_id, text=text)
-        session.add(post)
-        session.commit()
-        return post.id
-
-
-async def assign_tags_to_post(post_id: int, text: str):
-    with Session() as session:
-        all_tags = session.query(Tag).all()
-        available = [t.name for t in all_tags]
+async def save_post(message_id, chat_id, text) -> PendingPost:
+    """
+    Ставит пост в буфер отложенной записи и сразу возвращает его,
+    не дожидаясь коммита.
+    """
+    return await post_buffer.add_post(message_id, chat_id, text)
 
-    def task():
-        return tag_predict_client.predict_tags(text, available)
 
-    predicted_names = await asyncio.to_thread(task)
+async def assign_tags_to_post(post: PendingPost, text: str) -> dict[int, str]:
+    """
+    Предсказывает теги поста и ставит их в буфер записи.
+    Возвращает словарь tag_id -> имя тега.
+    """
+    predicted_names = await tag_predict_client.predict_tags_batched(
+        text, tag_registry.names())
 
-    with Session() as session:
-        tag_objs = session.query(Tag).filter(Tag.name.in_(predicted_names)).all()
-        for tag in tag_objs:
-            session.add(PostTag(post_id=post_id, tag_id=tag.id))
-        session.commit()
+    assigned = tag_registry.resolve(predicted_names)
+    new_tags = [tag_id for tag_id in assigned if tag_id not in post.stored_tags]
+    if new_tags:
+        await post_buffer.add_tags(post, new_tags)
+    return assigned
 
 
 async def fetch_channel_title(chat_id, client):
@@ -133,9 +155,11 @@ def add_target_channel(chat_id, user_id, title=None):
         if session.query(TargetChannel).filter_by(chat_id=chat_id,
                                                   user_id=user_id).first():
             return False
-        session.add(
-            TargetChannel(chat_id=chat_id, user_id=user_id, title=title))
+        target_channel = TargetChannel(chat_id=chat_id, user_id=user_id,
+                                       title=title)
+        session.add(target_channel)
         session.commit()
+        routing_index.upsert_target(target_channel)
         return True
 
 
@@ -144,8 +168,10 @@ def remove_target_channel(chat_id, user_id):
         target_channel = session.query(TargetChannel).filter_by(chat_id=chat_id,
                                                                 user_id=user_id).first()
         if target_channel:
+            target_channel_id = target_channel.id
             session.delete(target_channel)
             session.commit()
+            routing_index.remove_target(target_channel_id)
 
 
 def get_target_channels(user_id):
@@ -170,12 +196,41 @@ def add_tag_to_target_channel(chat_id, user_id, tag_name):
         if existing:
             return False
 
-        session.add(TargetChannelTag(target_channel_id=target_channel.id,
-                                     tag_id=tag.id))
+        target_channel_id, tag_id = target_channel.id, tag.id
+        session.add(TargetChannelTag(target_channel_id=target_channel_id,
+                                     tag_id=tag_id))
         session.commit()
+        routing_index.add_tag(target_channel_id, tag_id)
         return True
 
 
+def add_tag_id_to_target_channel(chat_id, user_id, tag_id):
+    """
+    Добавляет тег по id. Возвращает (статус, имя тега), где статус —
+    'ok', 'exists' или 'not_found'.
+    """
+    with Session() as session:
+        target_channel = session.query(TargetChannel).filter_by(chat_id=chat_id,
+                                                                user_id=user_id).first()
+        tag = session.query(Tag).filter_by(id=tag_id).first()
+        if not target_channel or not tag:
+            return 'not_found', None
+
+        tag_name = tag.name
+        exists = session.query(TargetChannelTag).filter_by(
+            target_channel_id=target_channel.id, tag_id=tag.id
+        ).first()
+        if exists:
+            return 'exists', tag_name
+
+        target_channel_id = target_channel.id
+        session.add(TargetChannelTag(target_channel_id=target_channel_id,
+                                     tag_id=tag_id))
+        session.commit()
+        routing_index.add_tag(target_channel_id, tag_id)
+        return 'ok', tag_name
+
+
 def remove_tag_from_target_channel(chat_id, user_id, tag_name):
     with Session() as session:
         target_channel = session.query(TargetChannel).filter_by(chat_id=chat_id,
@@ -191,8 +246,10 @@ def remove_tag_from_target_channel(chat_id, user_id, tag_name):
             target_channel_id=target_channel.id, tag_id=tag.id
         ).first()
         if association:
+            target_channel_id, tag_id = target_channel.id, tag.id
             session.delete(association)
             session.commit()
+            routing_index.remove_tag(target_channel_id, tag_id)
             return True
         return False
 
@@ -212,90 +269,117 @@ def get_tags_for_target_channel(chat_id, user_id):
         return tags
 
 
-def get_allowed_target_channels(post_id: int):
-    with Session() as session:
-        post_tags = session.query(PostTag).filter_by(post_id=post_id).all()
-        if not post_tags:
-            return []
-
-        post_tag_ids = {pt.tag_id for pt in post_tags}
-        target_channels = session.query(TargetChannel).all()
-
-        result = []
-        for tc in target_channels:
-            allowed = session.query(TargetChannelTag).filter_by(
-                target_channel_id=tc.id
-            ).all()
-            allowed_tag_ids = {at.tag_id for at in allowed}
-            if post_tag_ids & allowed_tag_ids:
-                result.append(tc)
-        return result
+def get_allowed_target_channels(tag_ids, user_ids=None):
+    """
+    Таргет-каналы, подписанные хотя бы на один из тегов поста.
+    Если задан user_ids, остаются только каналы этих пользователей
+    (пустое множество — ни одного канала).
+    Берутся из индекса в памяти, без запросов к БД.
+    """
+    if not tag_ids or user_ids is not None and not user_ids:
+        return []
+    targets = routing_index.match(tag_ids)
+    if user_ids is not None:
+        targets = [target for target in targets if target.user_id in user_ids]
+    return targets
 
 
 async def rewrite_text_if_needed(text: str, prompt: str) -> str:
     if not prompt:
         return text
 
-    loop = asyncio.get_event_loop()
+    key = rewrite_cache.make_key(text, prompt, rewrite_client.url)
+    cached = await asyncio.to_thread(rewrite_cache.get, key)
+    if cached is not None:
+        return cached
+
+    rewritten = await rewrite_client.rewrite(text=text, prompt=prompt)
+    await asyncio.to_thread(rewrite_cache.put, key, rewritten)
+    return rewritten
+
 
-    def rewrite_blocking():
-        return rewrite_client.rewrite(text=text, prompt=prompt)
+async def generate_image_if_needed(post_text: str,
+                                   user_prompt: str) -> GeneratedImage:
+    uuid = await fusion_api.run(post_text=post_text, user_prompt=user_prompt)
+    base64_image = (await fusion_api.check_generation(uuid))[0]
+    return GeneratedImage(base64.b64decode(base64_image))
+
+
+async def send_photo(bot, chat_id: int, image: GeneratedImage, caption: str,
+                     priority=SEND_PRIORITY_DEFAULT, **kwargs):
+    """
+    Отправляет картинку из памяти, без временных файлов. Уже загруженная
+    картинка отправляется по file_id из file_id_cache; если Telegram не
+    принял сам file_id, он удаляется из кэша и картинка загружается заново.
+    """
+    def send(photo):
+        return send_scheduler.submit(
+            chat_id,
+            lambda: bot.send_photo(chat_id, photo, caption=caption, **kwargs),
+            priority)
+
+    async def upload():
+        message = await send(image.input_file())
+        file_id_cache.put(image.key, _photo_file_id(message))
+        return message
+
+    file_id = file_id_cache.get(image.key)
+    if file_id is None:
+        if file_id_cache.claim_upload(image.key):
+            try:
+                return await upload()
+            finally:
+                file_id_cache.finish_upload(image.key)
+        # Ждём первого загрузчика недолго: его чат может стоять в flood wait
+        file_id = await file_id_cache.wait_upload(image.key)
+        if file_id is None:
+            return await upload()
 
-    return await loop.run_in_executor(None, rewrite_blocking)
+    try:
+        return await send(file_id)
+    except TelegramBadRequest as e:
+        # Ошибка разметки подписи и т.п. повторится и при загрузке байтов
+        if not _is_file_error(e):
+            raise
+        file_id_cache.evict(image.key, file_id)
+        return await upload()
 
 
-async def generate_image_if_needed(post_text: str, user_prompt: str) -> str:
-    loop = asyncio.get_event_loop()
+def _is_file_error(error: TelegramBadRequest) -> bool:
+    message = str(error).lower()
+    return "file" in message or "photo" in message
 
-    def generate():
-        pipeline_id = fusion_api.get_pipeline()
-        uuid = fusion_api.generate(post_text=post_text, user_prompt=user_prompt,
-                                   pipeline_id=pipeline_id)
-        return fusion_api.check_generation(uuid)[0]
 
-    base64_image = await loop.run_in_executor(None, generate)
-    return base64.b64decode(base64_image)
+def _photo_file_id(message):
+    if message is not None and message.photo:
+        return message.photo[-1].file_id
+    return None
 
 
 async def send_to_channel(bot, chat_id: int, title: str, text: str,
-                          image_data: bytes = None):
+                          image: GeneratedImage | bytes = None,
+                          priority=SEND_PRIORITY_DEFAULT) -> bool:
+    """
+    Отправляет пост через планировщик, соблюдающий лимиты Telegram.
+    """
     try:
-        if image_data:
-            with tempfile.NamedTemporaryFile(suffix=".jpg",
-                                             delete=False) as tmp:
-                tmp.write(image_data)
-                tmp_path = tmp.name
-            photo = FSInputFile(tmp_path)
-            await bot.send_photo(chat_id, photo, caption=text, parse_mode="Markdown")
-            os.remove(tmp_path)
+        if image:
+            if isinstance(image, bytes):
+                image = GeneratedImage(image)
+            await send_photo(bot, chat_id, image, text, priority,
+                             parse_mode="Markdown")
         else:
-            await bot.send_message(chat_id, text, parse_mode="Markdown")
+            await send_scheduler.submit(
+                chat_id,
+                lambda: bot.send_message(chat_id, text, parse_mode="Markdown"),
+                priority)
 
         print(f"📤 Отправлено в {chat_id} ({title})")
+        return True
 
     except Exception as e:
         print(f"❌ Ошибка отправки в {chat_id}: {e}")
-
-
-async def post_to_target_channels(bot, post_id: int, text: str):
-    target_channels = get_allowed_target_channels(post_id)
-    if not target_channels:
-        print("⚠️ Нет подходящих таргетных каналов.")
-        return
-
-    for channel in target_channels:
-        rewrite_prompt = (channel.rewrite_prompt or "").strip()
-        image_prompt = (channel.image_prompt or "").strip()
-        include_image = bool(channel.include_image)
-
-        try:
-            rewritten_text = await rewrite_text_if_needed(text, rewrite_prompt)
-            image_data = await generate_image_if_needed(text,
-                                                        image_prompt) if include_image else None
-            await send_to_channel(bot, channel.chat_id, channel.title,
-                                  rewritten_text, image_data)
-        except Exception as e:
-            print(f"❌ Ошибка при обработке канала {channel.chat_id}: {e}")
+        return False
 
 
 def get_all_tags():
@@ -321,6 +405,7 @@ def set_rewrite_prompt(chat_id, user_id, prompt):
             return False
         target_channel.rewrite_prompt = prompt
         session.commit()
+        routing_index.upsert_target(target_channel)
         return True
 
 
@@ -409,6 +494,7 @@ def set_image_prompt(chat_id, user_id, prompt: str):
             return False
         tc.image_prompt = prompt.strip() if prompt.strip() else None
         session.commit()
+        routing_index.upsert_target(tc)
         return True
 
 
@@ -427,6 +513,7 @@ def set_include_image(chat_id, user_id, include: bool):
             return False
         tc.include_image = 1 if include else 0
         session.commit()
+        routing_index.upsert_target(tc)
         return True
 
 
@@ -439,27 +526,24 @@ def get_include_image(chat_id, user_id):
 
 def make_rewrite_callback(bot, chat_id, title, include_image, image_prompt):
     async def callback(result):
-        try:
-            if include_image:
-                # здесь заглушка на картинку
-                from aiogram.types import FSInputFile
-                import tempfile, os
-                from PIL import Image
+        # здесь заглушка на картинку
+        image = placeholder_image() if include_image else None
+        await send_to_channel(bot, chat_id, title, result, image)
 
-                with tempfile.NamedTemporaryFile(suffix=".jpg",
-                                                 delete=False) as tmp:
-                    img = Image.new("RGB", (512, 512), (0, 0, 0))
-                    img.save(tmp.name)
-                    photo = FSInputFile(tmp.name)
+    return callback
 
-                await bot.send_photo(chat_id, photo, caption=result)
-                os.remove(tmp.name)
-            else:
-                await bot.send_message(chat_id, result)
 
-            print(f"📤 Отправлено в {chat_id} ({title})")
+_placeholder = None
 
-        except Exception as e:
-            print(f"⚠️ Ошибка отправки в {chat_id}: {e}")
 
-    return callback
+def placeholder_image() -> GeneratedImage:
+    """
+    Чёрная картинка-заглушка. Рисуется в памяти один раз, после первой
+    отправки уходит по file_id из file_id_cache.
+    """
+    global _placeholder
+    if _placeholder is None:
+        buffer = io.BytesIO()
+        Image.new("RGB", (512, 512), (0, 0, 0)).save(buffer, format="JPEG")
+        _placeholder = GeneratedImage(buffer.getvalue())
+    return _placeholder
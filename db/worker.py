@@ -0,0 +1,24 @@
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+from .config import DB_WORKERS
+
+# SQLite допускает одного писателя, поэтому по умолчанию (DB_WORKERS=1)
+# все обращения к БД выполняются одним выделенным потоком по очереди
+_executor = ThreadPoolExecutor(max_workers=DB_WORKERS,
+                               thread_name_prefix="db")
+
+
+async def run_db(func, *args, **kwargs):
+    """
+    Выполняет синхронную функцию работы с БД в потоке БД,
+    не блокируя цикл событий.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        _executor, functools.partial(func, *args, **kwargs))
+
+
+def shutdown():
+    _executor.shutdown(wait=True)
@@ -0,0 +1,229 @@
+import asyncio
+from collections import deque
+
+from sqlalchemy import insert
+
+from metrics.registry import metrics
+from .config import WRITE_BEHIND_INTERVAL, WRITE_BEHIND_MAX_PENDING, \
+    WRITE_BEHIND_MAX_RETRIES, WRITE_BEHIND_MAX_BUFFERED
+from .models import ParsedPost, PostTag
+from .session import Session
+from .worker import run_db
+
+
+class PendingPost:
+    """
+    Пост в памяти. id появляется после первого сброса буфера,
+    маршрутизация его не ждёт. stored_tags — теги, уже записанные в БД
+    (для поста, поднятого из БД после перезапуска).
+    """
+    __slots__ = ("message_id", "chat_id", "text", "id", "pending_tags",
+                 "stored_tags", "failures")
+
+    def __init__(self, message_id, chat_id, text):
+        self.message_id = message_id
+        self.chat_id = chat_id
+        self.text = text
+        self.id = None
+        self.pending_tags = []
+        self.stored_tags = frozenset()
+        self.failures = 0
+
+
+def _write_batch(jobs):
+    """
+    Пишет пакет одной транзакцией. jobs — список (post, is_new, tag_ids),
+    возвращает id постов в том же порядке.
+    """
+    with Session() as session:
+        created = {}
+        for index, (post, is_new, _) in enumerate(jobs):
+            if is_new:
+                created[index] = ParsedPost(message_id=post.message_id,
+                                            chat_id=post.chat_id,
+                                            text=post.text)
+        session.add_all(created.values())
+        session.flush()
+
+        ids = [created[i].id if i in created else post.id
+               for i, (post, _, _) in enumerate(jobs)]
+        rows = [{"post_id": post_id, "tag_id": tag_id}
+                for post_id, (_, _, tag_ids) in zip(ids, jobs)
+                for tag_id in tag_ids]
+        if rows:
+            session.execute(insert(PostTag), rows)
+        session.commit()
+        return ids
+
+
+def find_saved_post(chat_id, message_id) -> PendingPost | None:
+    """
+    Ищет пост, записанный до перезапуска, вместе с его тегами.
+    Возобновлённое задание берёт его вместо повторного add_post.
+    """
+    with Session() as session:
+        saved = (session.query(ParsedPost)
+                 .filter_by(chat_id=chat_id, message_id=message_id)
+                 .order_by(ParsedPost.id)
+                 .first())
+        if saved is None:
+            return None
+        post = PendingPost(saved.message_id, saved.chat_id, saved.text)
+        post.id = saved.id
+        post.stored_tags = frozenset(
+            tag_id for (tag_id,) in
+            session.query(PostTag.tag_id).filter_by(post_id=saved.id))
+        return post
+
+
+class PostWriteBuffer:
+    """
+    Отложенная запись ParsedPost/PostTag: вставки копятся в памяти и
+    сбрасываются одной транзакцией раз в flush_interval секунд или при
+    накоплении max_pending постов. При остановке буфер сбрасывается.
+
+    Если пакет не записался, он делится пополам, пока ошибка не сведётся
+    к отдельным постам; такой пост повторяется не больше max_retries раз
+    и затем откладывается в dead_letters. В буфере не больше max_buffered
+    постов: дальше добавление ждёт сброса.
+    """
+
+    def __init__(self, flush_interval=WRITE_BEHIND_INTERVAL,
+                 max_pending=WRITE_BEHIND_MAX_PENDING,
+                 max_retries=WRITE_BEHIND_MAX_RETRIES,
+                 max_buffered=WRITE_BEHIND_MAX_BUFFERED):
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.max_retries = max_retries
+        self.max_buffered = max_buffered
+        self._dirty = {}  # id(PendingPost) -> PendingPost, в порядке поступления
+        self._wake = asyncio.Event()
+        self._drained = asyncio.Condition()
+        self._flush_lock = asyncio.Lock()
+        self._task = None
+        self.flushes = 0
+        self.written_posts = 0
+        self.failed_batches = 0
+        self.dead_letters = deque(maxlen=1000)  # (PendingPost, tag_ids, ошибка)
+
+    @property
+    def write_through(self) -> bool:
+        return self.flush_interval <= 0
+
+    async def add_post(self, message_id, chat_id, text) -> PendingPost:
+        post = PendingPost(message_id, chat_id, text)
+        await self._mark_dirty(post)
+        return post
+
+    async def add_tags(self, post: PendingPost, tag_ids):
+        post.pending_tags.extend(tag_ids)
+        await self._mark_dirty(post)
+
+    async def _mark_dirty(self, post: PendingPost):
+        if id(post) not in self._dirty and not self.write_through \
+                and len(self._dirty) >= self.max_buffered:
+            # Обратное давление: ждём, пока сброс освободит место
+            self._wake.set()
+            async with self._drained:
+                await self._drained.wait_for(
+                    lambda: len(self._dirty) < self.max_buffered)
+
+        self._dirty[id(post)] = post
+        if self.write_through:
+            await self.flush()
+        elif len(self._dirty) >= self.max_pending:
+            self._wake.set()
+
+    async def flush(self):
+        async with self._flush_lock:
+            if not self._dirty:
+                return
+
+            posts = list(self._dirty.values())
+            self._dirty.clear()
+            jobs = []
+            for post in posts:
+                jobs.append((post, post.id is None, post.pending_tags))
+                post.pending_tags = []
+
+            # persist замеряет только постановку в буфер, здесь — сама запись
+            with metrics.timer("flush"):
+                await self._write(jobs)
+            self.flushes += 1
+
+        async with self._drained:
+            self._drained.notify_all()
+
+    async def _write(self, jobs):
+        try:
+            ids = await run_db(_write_batch, jobs)
+        except Exception as e:
+            self.failed_batches += 1
+            if len(jobs) > 1:
+                # Делим пакет, чтобы один плохой пост не держал остальные
+                middle = len(jobs) // 2
+                await self._write(jobs[:middle])
+                await self._write(jobs[middle:])
+            else:
+                self._requeue(jobs[0], e)
+            return
+
+        for (post, is_new, _), post_id in zip(jobs, ids):
+            post.id = post_id
+            post.failures = 0
+            if is_new:
+                self.written_posts += 1
+
+    def _requeue(self, job, error):
+        post, _, tag_ids = job
+        post.failures += 1
+        if post.failures >= self.max_retries:
+            self.dead_letters.append((post, tag_ids, str(error)))
+            print(f"❌ Пост {post.message_id} из {post.chat_id} не записан "
+                  f"после {post.failures} попыток и отложен: {error}")
+            return
+        # Повторим при следующем сбросе
+        post.pending_tags = tag_ids + post.pending_tags
+        self._dirty.setdefault(id(post), post)
+        print(f"⚠️ Не удалось записать пост {post.message_id} "
+              f"из {post.chat_id}: {error}")
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            # shield: остановка не должна прерывать уже начатую запись
+            await asyncio.shield(self.flush())
+
+    def start(self):
+        if self._task is None and not self.write_through:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    @property
+    def pending(self) -> int:
+        return len(self._dirty)
+
+    def stats(self) -> dict:
+        return {
+            "pending": self.pending,
+            "flushes": self.flushes,
+            "written_posts": self.written_posts,
+            "failed_batches": self.failed_batches,
+            "dead_letters": len(self.dead_letters),
+        }
+
+
+post_buffer = PostWriteBuffer()
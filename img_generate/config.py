@@ -1,3 +1,8 @@
 # https://fusionbrain.ai/
 API_KEY = "A69D9..."
 SECRET_KEY = "980EA..."
+
+# Сколько file_id загруженных картинок помнить для повторной отправки
+FILE_ID_CACHE_SIZE = 512
+# Сколько секунд ждать чужую загрузку той же картинки, прежде чем грузить самим
+FILE_ID_UPLOAD_WAIT = 2.0
@@ -0,0 +1,91 @@
+import asyncio
+from collections import OrderedDict
+
+from img_generate.config import FILE_ID_CACHE_SIZE, FILE_ID_UPLOAD_WAIT
+
+
+class FileIdCache:
+    """
+    LRU-кэш хэш картинки -> file_id в Telegram.
+
+    Загрузка одной картинки обычно выполняется один раз: пока первый
+    отправитель загружает байты, остальные ждут его не дольше upload_wait
+    секунд и затем отправляют file_id. Если загрузка застряла в очереди
+    своего чата (flood wait) или не удалась, каждый грузит картинку сам —
+    заблокированный чат не задерживает остальные.
+    """
+
+    def __init__(self, max_size=FILE_ID_CACHE_SIZE,
+                 upload_wait=FILE_ID_UPLOAD_WAIT):
+        self.max_size = max_size
+        self.upload_wait = upload_wait
+        self._entries = OrderedDict()  # key -> file_id
+        self._uploads = {}  # key -> Event, выставляется по окончании загрузки
+        self.hits = 0
+        self.misses = 0
+        self.uploads = 0
+        self.evictions = 0
+
+    def get(self, key):
+        file_id = self._entries.get(key)
+        if file_id is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return file_id
+
+    def put(self, key, file_id):
+        self.uploads += 1
+        if not file_id:
+            return
+        self._entries[key] = file_id
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def evict(self, key, file_id):
+        """Убирает file_id, который Telegram больше не принимает."""
+        if self._entries.get(key) == file_id:
+            del self._entries[key]
+            self.evictions += 1
+
+    def claim_upload(self, key) -> bool:
+        """
+        True, если загрузку картинки начинает вызывающий: тогда он обязан
+        вызвать finish_upload. False — картинку уже загружает другой.
+        """
+        if key in self._uploads:
+            return False
+        self._uploads[key] = asyncio.Event()
+        return True
+
+    def finish_upload(self, key):
+        event = self._uploads.pop(key, None)
+        if event is not None:
+            event.set()
+
+    async def wait_upload(self, key):
+        """
+        Ждёт чужую загрузку не дольше upload_wait секунд.
+        Возвращает file_id или None, если его так и не получили.
+        """
+        event = self._uploads.get(key)
+        if event is not None:
+            try:
+                await asyncio.wait_for(event.wait(), self.upload_wait)
+            except asyncio.TimeoutError:
+                return None
+        return self.get(key) if key in self._entries else None
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "uploads": self.uploads,
+            "evictions": self.evictions,
+        }
+
+
+file_id_cache = FileIdCache()
@@ -0,0 +1,25 @@
+import hashlib
+
+from aiogram.types import BufferedInputFile
+
+
+class GeneratedImage:
+    """
+    Сгенерированная картинка в памяти. key — хэш содержимого, по нему
+    file_id_cache находит уже загруженную в Telegram копию.
+    """
+    __slots__ = ("data", "filename", "_key")
+
+    def __init__(self, data: bytes, filename="image.jpg"):
+        self.data = data
+        self.filename = filename
+        self._key = None
+
+    @property
+    def key(self) -> str:
+        if self._key is None:
+            self._key = hashlib.blake2b(self.data, digest_size=16).hexdigest()
+        return self._key
+
+    def input_file(self) -> BufferedInputFile:
+        return BufferedInputFile(self.data, filename=self.filename)
@@ -1,25 +1,115 @@
 import json
 import time
-import base64
-import requests
+import asyncio
+import aiohttp
 
 from img_generate.config import API_KEY, SECRET_KEY
+from transport.http_transport import http_transport
+
+# Коды ответа на запуск генерации, которые означают устаревший pipeline_id
+STALE_PIPELINE_STATUSES = {400, 404, 410, 422}
 
 
 class FusionBrainAPI:
-    def __init__(self, base_url="https://api-key.fusionbrain.ai/"):
+    """
+    Асинхронный клиент FusionBrain поверх общего HTTP-транспорта.
+    Ожидание результата не занимает потоков: опрос статуса — это
+    asyncio.sleep с экспоненциальной задержкой.
+    """
+
+    def __init__(self, base_url="https://api-key.fusionbrain.ai/",
+                 pipeline_ttl=3600, pipeline_refresh_after=3000,
+                 poll_initial_delay=1.0, poll_max_delay=5.0,
+                 poll_backoff=1.5, poll_timeout=60, transport=http_transport):
         self.URL = base_url
         self.AUTH_HEADERS = {
             'X-Key': f'Key {API_KEY}',
             'X-Secret': f'Secret {SECRET_KEY}',
         }
+        self.transport = transport
+        self.poll_initial_delay = poll_initial_delay
+        self.poll_max_delay = poll_max_delay
+        self.poll_backoff = poll_backoff
+        self.poll_timeout = poll_timeout
+
+        # Кэш pipeline_id: после refresh_after секунд обновляется в фоне,
+        # после ttl — при следующем запросе
+        self.pipeline_ttl = pipeline_ttl
+        self.pipeline_refresh_after = pipeline_refresh_after
+        self._pipeline_id = None
+        self._pipeline_fetched_at = 0.0
+        self._pipeline_lock = None
+        self._refresh_task = None
+
+    async def close(self):
+        if self._refresh_task and not self._refresh_task.done():
+            self._refresh_task.cancel()
+
+    async def _request(self, method, path, **kwargs):
+        return await self.transport.request('fusionbrain', method,
+                                            self.URL + path,
+                                            headers=self.AUTH_HEADERS, **kwargs)
+
+    async def _fetch_pipeline(self):
+        if self._pipeline_lock is None:
+            self._pipeline_lock = asyncio.Lock()
+
+        async with self._pipeline_lock:
+            # Пока ждали блокировку, id мог обновить другой запрос
+            if (self._pipeline_id is not None and
+                    time.monotonic() - self._pipeline_fetched_at
+                    < self.pipeline_refresh_after):
+                return self._pipeline_id
+
+            data = await self._request('GET', 'key/api/v1/pipelines')
+            self._pipeline_id = data[0]['id']
+            self._pipeline_fetched_at = time.monotonic()
+            return self._pipeline_id
+
+    async def get_pipeline(self, force=False):
+        if force:
+            self.invalidate_pipeline()
 
-    def get_pipeline(self):
-        response = requests.get(self.URL + 'key/api/v1/pipelines', headers=self.AUTH_HEADERS)
-        response.raise_for_status()
-        return response.json()[0]['id']
+        age = time.monotonic() - self._pipeline_fetched_at
+        if self._pipeline_id is None or age > self.pipeline_ttl:
+            return await self._fetch_pipeline()
+        if age > self.pipeline_refresh_after:
+            self._refresh_in_background()
+        return self._pipeline_id
 
-    def generate(
+    def invalidate_pipeline(self):
+        self._pipeline_id = None
+        self._pipeline_fetched_at = 0.0
+
+    def _refresh_in_background(self):
+        if self._refresh_task and not self._refresh_task.done():
+            return
+
+        async def refresh():
+            try:
+                await self._fetch_pipeline()
+            except Exception as e:
+                print(f"⚠️ Не удалось обновить pipeline FusionBrain: {e}")
+
+        self._refresh_task = asyncio.create_task(refresh())
+
+    async def run(self, post_text, user_prompt, **kwargs):
+        """
+        Запускает генерацию с закэшированным pipeline_id.
+        Если запуск отклонён из-за устаревшего id, кэш сбрасывается
+        и запуск повторяется один раз.
+        """
+        try:
+            return await self.generate(post_text, user_prompt,
+                                       await self.get_pipeline(), **kwargs)
+        except aiohttp.ClientResponseError as e:
+            if e.status not in STALE_PIPELINE_STATUSES:
+                raise
+            return await self.generate(post_text, user_prompt,
+                                       await self.get_pipeline(force=True),
+                                       **kwargs)
+
+    async def generate(
             self,
             post_text,
             user_prompt,
@@ -49,27 +139,42 @@ class FusionBrainAPI:
             }
         }
 
-        data = {
-            'pipeline_id': (None, pipeline_id),
-            'params': (None, json.dumps(params), 'application/json')
-        }
+        def form():
+            data = aiohttp.FormData()
+            data.add_field('pipeline_id', pipeline_id)
+            data.add_field('params', json.dumps(params),
+                           content_type='application/json')
+            return data
 
-        response = requests.post(self.URL + 'key/api/v1/pipeline/run',
-                                 headers=self.AUTH_HEADERS, files=data)
-        response.raise_for_status()
-        return response.json()['uuid']
+        # Без повторов: после таймаута генерация могла уже запуститься,
+        # и повтор оплатил бы её второй раз
+        response = await self._request('POST', 'key/api/v1/pipeline/run',
+                                       retries=0, data_factory=form)
+        return response['uuid']
 
-    def check_generation(self, uuid, attempts=10, delay=3):
-        while attempts > 0:
-            response = requests.get(self.URL + f'key/api/v1/pipeline/status/{uuid}', headers=self.AUTH_HEADERS)
-            response.raise_for_status()
-            data = response.json()
+    async def check_generation(self, uuid, timeout=None, initial_delay=None,
+                               max_delay=None, backoff=None):
+        """
+        Ждёт завершения генерации, опрашивая статус с растущей задержкой.
+        """
+        timeout = self.poll_timeout if timeout is None else timeout
+        delay = self.poll_initial_delay if initial_delay is None else initial_delay
+        max_delay = self.poll_max_delay if max_delay is None else max_delay
+        backoff = self.poll_backoff if backoff is None else backoff
+        deadline = time.monotonic() + timeout
+
+        while True:
+            data = await self._request('GET',
+                                       f'key/api/v1/pipeline/status/{uuid}')
             if data['status'] == 'DONE':
                 if data['result']['censored']:
                     raise RuntimeError("⚠️ Картинка отклонена цензурой.")
                 return data['result']['files']
             elif data['status'] == 'FAIL':
                 raise RuntimeError("❌ Генерация не удалась.")
-            time.sleep(delay)
-            attempts -= 1
-        raise TimeoutError("🕒 Истекло время ожидания")
+
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise TimeoutError("🕒 Истекло время ожидания")
+            await asyncio.sleep(min(delay, remaining))
+            delay = min(delay * backoff, max_delay)
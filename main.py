@@ -3,32 +3,27 @@ from aiogram import Bot
 from aiogram.types import BotCommand
 
 from bot.bot_instance import dp, bot
-from client.listeners import add_channel_listener
-from db.utils import init_db, get_all_users_with_accounts, get_active_channels
-from client.client_manager import start_user_client, get_user_client
+from client.startup import start_all_user_clients
+from client.pool import listener_pool
+from client.client_manager import client_stats, stop_all_clients
+from db.utils import init_db, fusion_api
+from db.write_behind import post_buffer
+from db.worker import shutdown as shutdown_db
+from client.handlers import process_post
+from pipeline.ingest import ingest_queue
+from pipeline.send_scheduler import send_scheduler
+from pipeline.dedup import duplicate_detector
+from metrics.config import METRICS_ENABLED
+from metrics.registry import metrics
+from metrics.server import start_metrics_server
+from img_generate.file_id_cache import file_id_cache
+from text_generate.rewrite_cache import rewrite_cache
+from pipeline.jobs import resume_unfinished_jobs, compact_jobs_forever
+from text_generate.tag_predictor import tag_predict_client
+from transport.http_transport import http_transport
 from bot import handlers as bot_handlers  # Регистрируем хендлеры
 
 
-async def start_all_user_clients():
-    users = get_all_users_with_accounts()
-    if users:
-        print("🔄 Инициализация Telegram-клиентов для пользователей...")
-        for user in users:
-            try:
-                result = await start_user_client(user.id)
-                if result == 'ok':
-                    client = get_user_client(user.id)
-                    channels = get_active_channels(user.id)
-                    for channel in channels:
-                        await add_channel_listener(channel.chat_id, client)
-
-            except Exception as e:
-                print(
-                    f"⚠️ Не удалось запустить клиента для user_id={user.id}: {e}")
-    else:
-        print("❗️ Нет пользователей с Telegram-аккаунтами.")
-
-
 async def set_bot_commands(bot: Bot):
     commands = [
         BotCommand(command="start", description="Главное меню")
@@ -36,13 +31,48 @@ async def set_bot_commands(bot: Bot):
     await bot.set_my_commands(commands)
 
 
+def register_metrics():
+    metrics.register_collector("ingest", ingest_queue.stats)
+    metrics.register_collector("dedup", duplicate_detector.stats)
+    metrics.register_collector("write_behind", post_buffer.stats)
+    metrics.register_collector("send", send_scheduler.stats)
+    metrics.register_collector("rewrite_cache", rewrite_cache.stats)
+    metrics.register_collector("file_id_cache", file_id_cache.stats)
+    metrics.register_collector("transport", http_transport.stats)
+    metrics.register_collector("clients", client_stats)
+    if listener_pool.enabled:
+        metrics.register_collector("listener_pool", listener_pool.stats)
+
+
 async def main():
     init_db()
     await set_bot_commands(bot)  # установка кнопки меню
-    await asyncio.gather(
-        dp.start_polling(bot),
-        start_all_user_clients()
-    )
+    post_buffer.start()
+    ingest_queue.start(process_post)
+    send_scheduler.start()
+    compactor = asyncio.create_task(compact_jobs_forever())
+    metrics_runner = None
+    if METRICS_ENABLED:
+        register_metrics()
+        metrics_runner = await start_metrics_server()
+    try:
+        await asyncio.gather(
+            dp.start_polling(bot),
+            start_all_user_clients(),
+            resume_unfinished_jobs()
+        )
+    finally:
+        compactor.cancel()
+        await stop_all_clients()
+        if metrics_runner is not None:
+            await metrics_runner.cleanup()
+        await ingest_queue.stop()
+        await send_scheduler.stop()
+        await post_buffer.stop()
+        shutdown_db()  # буфер сброшен — дожидаемся потока БД
+        await fusion_api.close()
+        await tag_predict_client.close()
+        await http_transport.close()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,102 @@
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from metrics.config import LATENCY_BUCKETS
+
+# Канал-источник обрабатываемого поста. Задачи, созданные внутри
+# обработки (раздача по каналам), наследуют значение автоматически.
+current_source = ContextVar("current_source", default="")
+
+
+class Histogram:
+    """Накопительная гистограмма одной серии меток."""
+    __slots__ = ("counts", "sum", "count")
+
+    def __init__(self, size):
+        self.counts = [0] * size
+        self.sum = 0.0
+        self.count = 0
+
+
+class MetricsRegistry:
+    """
+    Гистограммы задержек этапов обработки поста (ingest, job, persist,
+    flush, tag, route, rewrite, image, send) с метками stage, source и
+    target, плюс снимки stats() компонентов в виде gauge.
+    Наблюдение — поиск корзины и три сложения, без блокировок: метрики
+    пишутся только из цикла событий.
+    """
+
+    def __init__(self, buckets=LATENCY_BUCKETS, prefix="neural_news"):
+        self.buckets = tuple(buckets)
+        self.prefix = prefix
+        self._series = {}  # (stage, source, target) -> Histogram
+        self._collectors = {}  # имя -> функция, возвращающая dict
+
+    def observe(self, stage: str, seconds: float, target=""):
+        key = (stage, str(current_source.get()), str(target))
+        histogram = self._series.get(key)
+        if histogram is None:
+            histogram = self._series[key] = Histogram(len(self.buckets) + 1)
+        histogram.counts[bisect_left(self.buckets, seconds)] += 1
+        histogram.sum += seconds
+        histogram.count += 1
+
+    @contextmanager
+    def timer(self, stage: str, target=""):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - start, target)
+
+    async def timed(self, stage: str, awaitable, target=""):
+        with self.timer(stage, target):
+            return await awaitable
+
+    def register_collector(self, name: str, stats):
+        """stats — функция без аргументов, возвращающая dict чисел."""
+        self._collectors[name] = stats
+
+    def render(self) -> str:
+        """Текущее состояние в текстовом формате Prometheus."""
+        lines = []
+        name = f"{self.prefix}_stage_seconds"
+        lines.append(f"# HELP {name} Длительность этапа обработки поста.")
+        lines.append(f"# TYPE {name} histogram")
+        for (stage, source, target), hist in sorted(self._series.items()):
+            labels = (f'stage="{stage}",source="{source}",'
+                      f'target="{target}"')
+            cumulative = 0
+            for bound, count in zip(self.buckets, hist.counts):
+                cumulative += count
+                lines.append(f'{name}_bucket{{{labels},le="{bound}"}} '
+                             f'{cumulative}')
+            lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {hist.count}')
+            lines.append(f"{name}_sum{{{labels}}} {hist.sum:.6f}")
+            lines.append(f"{name}_count{{{labels}}} {hist.count}")
+
+        for collector, stats in self._collectors.items():
+            try:
+                values = stats()
+            except Exception as e:
+                print(f"⚠️ Не удалось собрать метрики {collector}: {e}")
+                continue
+            lines.extend(self._render_stats(collector, values))
+        return "\n".join(lines) + "\n"
+
+    def _render_stats(self, collector, values, labels=""):
+        for key, value in values.items():
+            if isinstance(value, dict):
+                # Вложенный словарь (например, по эндпоинтам) — метка key
+                yield from self._render_stats(collector, value,
+                                              f'key="{key}"')
+            elif isinstance(value, (int, float)):
+                metric = f"{self.prefix}_{collector}_{key}"
+                series = f"{metric}{{{labels}}}" if labels else metric
+                yield f"{series} {float(value)}"
+
+
+metrics = MetricsRegistry()
@@ -0,0 +1,23 @@
+from aiohttp import web
+
+from metrics.config import METRICS_HOST, METRICS_PORT
+from metrics.registry import metrics
+
+
+async def _handle_metrics(request):
+    return web.Response(text=metrics.render(), headers={
+        "Content-Type": "text/plain; version=0.0.4; charset=utf-8"})
+
+
+async def start_metrics_server(host=METRICS_HOST, port=METRICS_PORT):
+    """
+    Поднимает локальный HTTP-эндпоинт /metrics. Возвращает runner,
+    который нужно закрыть через runner.cleanup().
+    """
+    app = web.Application()
+    app.router.add_get("/metrics", _handle_metrics)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    print(f"📈 Метрики доступны на http://{host}:{port}/metrics")
+    return runner
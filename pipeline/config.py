@@ -0,0 +1,35 @@
+# Ограничения параллелизма для раздачи поста по таргет-каналам.
+# Лимиты общие для всех постов, обрабатываемых процессом.
+REWRITE_CONCURRENCY = 4
+IMAGE_CONCURRENCY = 4
+
+# Поиск дублей: окно хранения отпечатков (сек), максимальное расстояние
+# Хэмминга между SimHash почти одинаковых текстов и минимальная длина
+# текста в словах, с которой включается нечёткое сравнение
+DEDUP_WINDOW = 6 * 3600
+DEDUP_MAX_DISTANCE = 6
+DEDUP_MIN_TOKENS = 8
+
+# Очередь входящих постов между слушателями Telethon и обработкой
+INGEST_QUEUE_SIZE = 1000  # всего постов в очереди
+INGEST_PER_SOURCE_LIMIT = 100  # постов одного канала-источника
+INGEST_PUT_TIMEOUT = 5  # сколько слушатель ждёт места, прежде чем сбросить пост
+INGEST_WORKERS = 4
+
+# Сохранённые задания: как часто удалять завершённые (сек)
+JOB_COMPACT_INTERVAL = 3600
+
+# Планировщик отправки ботом: лимиты Telegram Bot API на всего бота
+# (сообщений в секунду) и на один чат (20 сообщений в минуту в канал),
+# сколько отправок выполняется одновременно и сколько раз повторять
+# отправку после TelegramRetryAfter
+SEND_GLOBAL_RATE = 30
+SEND_GLOBAL_BURST = 30
+SEND_PER_CHAT_RATE = 20 / 60
+SEND_PER_CHAT_BURST = 3
+SEND_CONCURRENCY = 8
+SEND_MAX_FLOOD_RETRIES = 5
+
+# Приоритеты отправки: меньше — раньше
+SEND_PRIORITY_DEFAULT = 10
+SEND_PRIORITY_RESUMED = 20
@@ -0,0 +1,151 @@
+import hashlib
+import re
+import time
+from collections import deque
+
+from pipeline.config import DEDUP_WINDOW, DEDUP_MAX_DISTANCE, DEDUP_MIN_TOKENS
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+_BITS = 64
+_BANDS = 8  # 8 полос по 8 бит: при расстоянии <= 7 одна полоса совпадёт
+_BAND_BITS = _BITS // _BANDS
+
+
+def _tokens(text: str) -> list[str]:
+    return _TOKEN_RE.findall(text.lower())
+
+
+def simhash(tokens: list[str]) -> int:
+    """
+    64-битный SimHash по словам текста.
+    """
+    weights = [0] * _BITS
+    for token in tokens:
+        h = int.from_bytes(
+            hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest(),
+            "big")
+        for bit in range(_BITS):
+            weights[bit] += 1 if h >> bit & 1 else -1
+    return sum(1 << bit for bit, w in enumerate(weights) if w > 0)
+
+
+def _bands(fingerprint: int):
+    mask = (1 << _BAND_BITS) - 1
+    return [(fingerprint >> (i * _BAND_BITS)) & mask for i in range(_BANDS)]
+
+
+class DuplicateDetector:
+    """
+    Отсекает повторы до запуска моделей: точные — по (chat_id, message_id),
+    почти одинаковые тексты — по SimHash с поиском кандидатов через полосы.
+    Почти одинаковый текст считается дублем только для тех пользователей,
+    которым похожий пост уже ушёл. Отпечатки хранятся window секунд.
+    """
+
+    def __init__(self, window=DEDUP_WINDOW, max_distance=DEDUP_MAX_DISTANCE,
+                 min_tokens=DEDUP_MIN_TOKENS):
+        self.window = window
+        self.max_distance = max_distance
+        self.min_tokens = min_tokens
+        self._messages = {}  # (chat_id, message_id) -> ts
+        self._fingerprints = {}  # seq -> simhash
+        self._owners = {}  # seq -> frozenset(user_id), получившие пост
+        self._bands = [{} for _ in range(_BANDS)]  # значение полосы -> set(seq)
+        self._expiry = deque()  # (ts, (chat_id, message_id), seq | None)
+        self._seq = 0
+        self.seen = 0
+        self.suppressed_exact = 0
+        self.suppressed_near = 0
+
+    def check(self, chat_id, message_id, text: str, owners=frozenset(),
+              now=None) -> tuple[str | None, frozenset]:
+        """
+        Возвращает ('exact' | 'near', пустое множество) для дубля, иначе
+        (None, владельцы, которым пост ещё не приходил) и запоминает пост.
+        Без owners почти одинаковый текст — дубль для всех.
+        """
+        now = time.monotonic() if now is None else now
+        self._evict(now)
+        self.seen += 1
+
+        key = (chat_id, message_id)
+        if key in self._messages:
+            self.suppressed_exact += 1
+            return "exact", frozenset()
+
+        tokens = _tokens(text or "")
+        fingerprint = None
+        if len(tokens) >= self.min_tokens:
+            fingerprint = simhash(tokens)
+            matched, covered = self._near_owners(fingerprint)
+            if matched:
+                owners = frozenset() if covered is None \
+                    else frozenset(owners) - covered
+                if not owners:
+                    self._messages[key] = now
+                    self._expiry.append((now, key, None))
+                    self.suppressed_near += 1
+                    return "near", frozenset()
+
+        self._messages[key] = now
+        seq = None
+        if fingerprint is not None:
+            seq = self._seq
+            self._seq += 1
+            self._fingerprints[seq] = fingerprint
+            self._owners[seq] = frozenset(owners)
+            for band, value in zip(self._bands, _bands(fingerprint)):
+                band.setdefault(value, set()).add(seq)
+        self._expiry.append((now, key, seq))
+        return None, frozenset(owners)
+
+    def _near_owners(self, fingerprint: int):
+        """
+        Есть ли почти одинаковые отпечатки и кому уже ушли такие посты.
+        Отпечаток без владельцев закрывает всех (covered = None).
+        """
+        matched = False
+        covered = set()
+        checked = set()
+        for band, value in zip(self._bands, _bands(fingerprint)):
+            for seq in band.get(value, ()):
+                if seq in checked:
+                    continue
+                checked.add(seq)
+                distance = (self._fingerprints[seq] ^ fingerprint).bit_count()
+                if distance <= self.max_distance:
+                    if not self._owners[seq]:
+                        return True, None
+                    matched = True
+                    covered.update(self._owners[seq])
+        return matched, frozenset(covered)
+
+    def _evict(self, now: float):
+        while self._expiry and now - self._expiry[0][0] > self.window:
+            _, key, seq = self._expiry.popleft()
+            self._messages.pop(key, None)
+            if seq is None:
+                continue
+            fingerprint = self._fingerprints.pop(seq)
+            self._owners.pop(seq, None)
+            for band, value in zip(self._bands, _bands(fingerprint)):
+                bucket = band.get(value)
+                if bucket is not None:
+                    bucket.discard(seq)
+                    if not bucket:
+                        del band[value]
+
+    @property
+    def suppressed(self) -> int:
+        return self.suppressed_exact + self.suppressed_near
+
+    def stats(self) -> dict:
+        return {
+            "seen": self.seen,
+            "suppressed_exact": self.suppressed_exact,
+            "suppressed_near": self.suppressed_near,
+            "tracked": len(self._messages),
+        }
+
+
+duplicate_detector = DuplicateDetector()
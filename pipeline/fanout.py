@@ -0,0 +1,95 @@
+import asyncio
+
+from db.utils import rewrite_text_if_needed, generate_image_if_needed, \
+    send_to_channel
+from pipeline.config import REWRITE_CONCURRENCY, IMAGE_CONCURRENCY, \
+    SEND_PRIORITY_DEFAULT
+from pipeline.planner import PostWorkPlan
+from metrics.registry import metrics
+
+
+class FanOut:
+    """
+    Параллельная раздача поста по таргет-каналам.
+    Рерайт и генерация картинки ограничены отдельными семафорами, отправку
+    сглаживает планировщик (pipeline.send_scheduler), ошибка в одном канале
+    не влияет на остальные. Одинаковые рерайты и картинки выполняются
+    один раз на пост (см. PostWorkPlan).
+    """
+
+    def __init__(self, rewrite_limit=REWRITE_CONCURRENCY,
+                 image_limit=IMAGE_CONCURRENCY):
+        self._rewrite_sem = asyncio.Semaphore(rewrite_limit)
+        self._image_sem = asyncio.Semaphore(image_limit)
+
+    async def deliver(self, bot, target_channels, text: str,
+                      on_result=None, priority=SEND_PRIORITY_DEFAULT) -> int:
+        """
+        Отправляет пост во все каналы одновременно.
+        on_result(channel, ok, error) — необязательная корутина, которая
+        вызывается по завершении каждого канала.
+        Возвращает число каналов, обработанных без ошибок.
+        """
+        plan = PostWorkPlan(text, self._rewrite, self._image)
+        results = await asyncio.gather(
+            *(self._deliver_one(bot, channel, plan, on_result, priority)
+              for channel in target_channels)
+        )
+        print(f"🧮 Выполнено {plan.summary()}")
+        return sum(results)
+
+    async def _rewrite(self, text: str, prompt: str) -> str:
+        if not prompt:
+            return text
+        async with self._rewrite_sem:
+            return await rewrite_text_if_needed(text, prompt)
+
+    async def _image(self, text: str, prompt: str):
+        async with self._image_sem:
+            return await generate_image_if_needed(text, prompt)
+
+    async def _deliver_one(self, bot, channel, plan: PostWorkPlan,
+                           on_result=None,
+                           priority=SEND_PRIORITY_DEFAULT) -> bool:
+        ok, error = await self._process_one(bot, channel, plan, priority)
+        if on_result is not None:
+            try:
+                await on_result(channel, ok, error)
+            except Exception as e:
+                print(f"⚠️ Не удалось сохранить результат для канала "
+                      f"{channel.chat_id}: {e}")
+        return ok
+
+    async def _process_one(self, bot, channel, plan: PostWorkPlan, priority):
+        rewrite_prompt = (channel.rewrite_prompt or "").strip()
+        image_prompt = (channel.image_prompt or "").strip()
+        include_image = bool(channel.include_image)
+
+        try:
+            # Рерайт и картинка зависят только от исходного текста,
+            # поэтому выполняются одновременно
+            target = channel.chat_id
+            jobs = [metrics.timed("rewrite", plan.rewrite(rewrite_prompt),
+                                  target)]
+            if include_image:
+                jobs.append(metrics.timed("image", plan.image(image_prompt),
+                                          target))
+            results = await asyncio.gather(*jobs, return_exceptions=True)
+            for result in results:
+                if isinstance(result, BaseException):
+                    raise result
+
+            rewritten_text = results[0]
+            image = results[1] if include_image else None
+
+            with metrics.timer("send", target):
+                sent = await send_to_channel(bot, channel.chat_id,
+                                             channel.title, rewritten_text,
+                                             image, priority)
+            return sent, None if sent else "send failed"
+        except Exception as e:
+            print(f"❌ Ошибка при обработке канала {channel.chat_id}: {e}")
+            return False, str(e)
+
+
+fanout = FanOut()
@@ -0,0 +1,157 @@
+import asyncio
+import time
+from collections import deque
+from dataclasses import dataclass, field
+
+from pipeline.config import INGEST_QUEUE_SIZE, INGEST_PER_SOURCE_LIMIT, \
+    INGEST_PUT_TIMEOUT, INGEST_WORKERS
+
+
+@dataclass(slots=True)
+class IngestEvent:
+    """Компактная запись о входящем сообщении для очереди обработки."""
+    chat_id: int
+    message_id: int
+    text: str
+    sender_id: int | None = None
+    owners: frozenset = frozenset()  # user_id подписанных на канал
+    resumed: bool = False  # задание восстановлено после перезапуска
+    received_at: float = field(default_factory=time.monotonic)
+
+
+class IngestQueue:
+    """
+    Ограниченная очередь входящих постов с пулом обработчиков.
+
+    Посты каждого канала-источника лежат в своей очереди, обработчики
+    забирают их по кругу, поэтому заваливающий сообщениями канал не
+    задерживает остальные. При переполнении очереди канала выбрасывается
+    его самый старый пост; при переполнении всей очереди слушатель ждёт
+    место не дольше put_timeout секунд. Восстановленные задания
+    (put(..., drop=False)) ждут места без сброса.
+    """
+
+    def __init__(self, maxsize=INGEST_QUEUE_SIZE,
+                 per_source_limit=INGEST_PER_SOURCE_LIMIT,
+                 put_timeout=INGEST_PUT_TIMEOUT):
+        self.maxsize = maxsize
+        self.per_source_limit = per_source_limit
+        self.put_timeout = put_timeout
+        self._sources = {}  # chat_id -> deque[IngestEvent]
+        self._ready = deque()  # chat_id по кругу
+        self._size = 0
+        self._changed = asyncio.Condition()
+        self._workers = []
+
+        self.enqueued = 0
+        self.processed = 0
+        self.dropped = 0
+        self.failed = 0
+        self.max_depth = 0
+        self.waited = 0  # постов, чьё ожидание учтено в total_wait
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def __len__(self):
+        return self._size
+
+    async def put(self, event: IngestEvent, drop=True) -> bool:
+        """
+        Ставит пост в очередь. Возвращает False, если пост пришлось сбросить;
+        вытесненный старый пост канала тоже попадает в dropped и в лог.
+        С drop=False ждёт места в очереди, ничего не сбрасывая.
+        """
+        async with self._changed:
+            if not drop:
+                await self._changed.wait_for(
+                    lambda: self._size < self.maxsize and len(
+                        self._sources.get(event.chat_id, ()))
+                    < self.per_source_limit)
+
+            source = self._sources.get(event.chat_id)
+            if source is not None and len(source) >= self.per_source_limit:
+                oldest = source.popleft()
+                self._size -= 1
+                self.dropped += 1
+                print(f"⚠️ Очередь канала {event.chat_id} переполнена, "
+                      f"старый пост {oldest.message_id} сброшен.")
+            elif self._size >= self.maxsize:
+                try:
+                    await asyncio.wait_for(
+                        self._changed.wait_for(
+                            lambda: self._size < self.maxsize),
+                        self.put_timeout)
+                except asyncio.TimeoutError:
+                    self.dropped += 1
+                    print(f"⚠️ Очередь обработки переполнена, пост "
+                          f"{event.message_id} из {event.chat_id} сброшен.")
+                    return False
+
+            source = self._sources.get(event.chat_id)
+            if source is None:
+                source = self._sources[event.chat_id] = deque()
+                self._ready.append(event.chat_id)
+            source.append(event)
+            self._size += 1
+            self.enqueued += 1
+            self.max_depth = max(self.max_depth, self._size)
+            self._changed.notify_all()
+            return True
+
+    async def get(self) -> IngestEvent:
+        async with self._changed:
+            await self._changed.wait_for(lambda: self._size > 0)
+            chat_id = self._ready.popleft()
+            source = self._sources[chat_id]
+            event = source.popleft()
+            if source:
+                self._ready.append(chat_id)
+            else:
+                del self._sources[chat_id]
+            self._size -= 1
+            self._changed.notify_all()
+
+        wait = time.monotonic() - event.received_at
+        self.waited += 1
+        self.total_wait += wait
+        self.max_wait = max(self.max_wait, wait)
+        return event
+
+    async def _worker(self, handler):
+        while True:
+            event = await self.get()
+            try:
+                await handler(event)
+            except Exception as e:
+                self.failed += 1
+                print(f"⚠️ Ошибка обработки поста {event.message_id} "
+                      f"из {event.chat_id}: {e}")
+            finally:
+                self.processed += 1
+
+    def start(self, handler, workers=INGEST_WORKERS):
+        for _ in range(workers):
+            self._workers.append(asyncio.create_task(self._worker(handler)))
+
+    async def stop(self):
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers.clear()
+
+    def stats(self) -> dict:
+        return {
+            "depth": self._size,
+            "max_depth": self.max_depth,
+            "sources": len(self._sources),
+            "enqueued": self.enqueued,
+            "processed": self.processed,
+            "failed": self.failed,
+            "dropped": self.dropped,
+            "avg_wait_ms": (self.total_wait / self.waited * 1000
+                            if self.waited else 0.0),
+            "max_wait_ms": self.max_wait * 1000,
+        }
+
+
+ingest_queue = IngestQueue()
@@ -0,0 +1,40 @@
+import asyncio
+
+from db.aio import get_unfinished_jobs, compact_jobs, get_channel_owners
+from pipeline.config import JOB_COMPACT_INTERVAL
+from pipeline.ingest import IngestEvent, ingest_queue
+
+
+async def resume_unfinished_jobs(queue=ingest_queue):
+    """
+    Ставит в очередь обработки задания, прерванные перезапуском процесса:
+    их выполняют обычные обработчики очереди, и ошибка одного задания
+    не останавливает бота. Уже доставленные таргет-каналы не повторяются.
+    """
+    try:
+        jobs = await get_unfinished_jobs()
+        if not jobs:
+            return 0
+
+        print(f"🔁 Возобновляем незавершённые задания: {len(jobs)}")
+        for job_id, chat_id, message_id, text, sender_id in jobs:
+            await queue.put(IngestEvent(
+                chat_id=chat_id, message_id=message_id, text=text,
+                sender_id=sender_id,
+                owners=await get_channel_owners(chat_id),
+                resumed=True), drop=False)
+        return len(jobs)
+    except Exception as e:
+        print(f"⚠️ Ошибка возобновления заданий: {e}")
+        return 0
+
+
+async def compact_jobs_forever(interval=JOB_COMPACT_INTERVAL):
+    while True:
+        try:
+            removed = await compact_jobs()
+            if removed:
+                print(f"🧹 Удалено завершённых заданий: {removed}")
+        except Exception as e:
+            print(f"⚠️ Ошибка очистки заданий: {e}")
+        await asyncio.sleep(interval)
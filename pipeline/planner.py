@@ -0,0 +1,48 @@
+import asyncio
+
+
+class PostWorkPlan:
+    """
+    План работы над одним постом.
+    Таргет-каналы группируются по (text, rewrite_prompt) и (text, image_prompt):
+    каждая уникальная задача выполняется один раз, а результат получают
+    все каналы группы.
+    """
+
+    def __init__(self, text: str, rewrite, image):
+        self.text = text
+        self._rewrite = rewrite
+        self._image = image
+        self._rewrites = {}  # (text, prompt) -> Task
+        self._images = {}  # (text, prompt) -> Task
+        self.rewrite_requests = 0
+        self.image_requests = 0
+
+    def rewrite(self, prompt: str):
+        self.rewrite_requests += 1
+        return self._shared(self._rewrites, self._rewrite, prompt)
+
+    def image(self, prompt: str):
+        self.image_requests += 1
+        return self._shared(self._images, self._image, prompt)
+
+    def _shared(self, jobs: dict, func, prompt: str):
+        key = (self.text, prompt)
+        task = jobs.get(key)
+        if task is None:
+            task = asyncio.ensure_future(func(self.text, prompt))
+            jobs[key] = task
+        # shield: отмена одного канала не должна отменять общую задачу
+        return asyncio.shield(task)
+
+    @property
+    def rewrite_jobs(self) -> int:
+        return len(self._rewrites)
+
+    @property
+    def image_jobs(self) -> int:
+        return len(self._images)
+
+    def summary(self) -> str:
+        return (f"рерайтов {self.rewrite_jobs} из {self.rewrite_requests}, "
+                f"картинок {self.image_jobs} из {self.image_requests}")
@@ -0,0 +1,239 @@
+import asyncio
+import heapq
+import itertools
+import time
+
+from aiogram.exceptions import TelegramRetryAfter
+
+from pipeline.config import SEND_GLOBAL_RATE, SEND_GLOBAL_BURST, \
+    SEND_PER_CHAT_RATE, SEND_PER_CHAT_BURST, SEND_CONCURRENCY, \
+    SEND_MAX_FLOOD_RETRIES, SEND_PRIORITY_DEFAULT
+
+
+class TokenBucket:
+    """Корзина токенов: rate токенов в секунду, не больше capacity."""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+
+    def _refill(self, now):
+        self._tokens = min(self.capacity,
+                           self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def delay(self, now=None) -> float:
+        """Сколько секунд ждать до появления токена."""
+        now = time.monotonic() if now is None else now
+        self._refill(now)
+        if self._tokens >= 1:
+            return 0.0
+        return (1 - self._tokens) / self.rate
+
+    def take(self, now=None):
+        now = time.monotonic() if now is None else now
+        self._refill(now)
+        self._tokens -= 1
+
+
+class _SendJob:
+    __slots__ = ("chat_id", "send", "future", "enqueued_at", "flood_retries")
+
+    def __init__(self, chat_id, send, future):
+        self.chat_id = chat_id
+        self.send = send
+        self.future = future
+        self.enqueued_at = time.monotonic()
+        self.flood_retries = 0
+
+
+class SendScheduler:
+    """
+    Очередь исходящих сообщений бота с учётом лимитов Telegram.
+
+    Отправки выполняются по приоритету, но не чаще, чем позволяют общая
+    корзина токенов бота и корзина каждого чата. Чат, исчерпавший лимит
+    или получивший TelegramRetryAfter, откладывается до нужного момента,
+    не задерживая отправки в другие чаты.
+    """
+
+    def __init__(self, global_rate=SEND_GLOBAL_RATE,
+                 global_burst=SEND_GLOBAL_BURST,
+                 chat_rate=SEND_PER_CHAT_RATE, chat_burst=SEND_PER_CHAT_BURST,
+                 concurrency=SEND_CONCURRENCY,
+                 max_flood_retries=SEND_MAX_FLOOD_RETRIES):
+        self._global = TokenBucket(global_rate, global_burst)
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self.concurrency = concurrency
+        self.max_flood_retries = max_flood_retries
+
+        self._seq = itertools.count()
+        self._chats = {}  # chat_id -> куча (priority, seq, job)
+        self._buckets = {}  # chat_id -> TokenBucket
+        self._blocked_until = {}  # chat_id -> monotonic-время конца flood wait
+        self._ready = []  # куча (priority, seq, chat_id) чатов, готовых к отправке
+        self._sleeping = []  # куча (ready_at, chat_id) отложенных чатов
+        self._wakeup = None
+        self._slots = None
+        self._dispatcher = None
+        self._in_flight = set()
+
+        self.sent = 0
+        self.failed = 0
+        self.flood_waits = 0
+        self._wait_total = 0.0
+        self.max_wait = 0.0
+
+    def start(self):
+        if self._dispatcher is None or self._dispatcher.done():
+            self._wakeup = asyncio.Event()
+            self._slots = asyncio.Semaphore(self.concurrency)
+            self._dispatcher = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._dispatcher is not None:
+            self._dispatcher.cancel()
+            try:
+                await self._dispatcher
+            except asyncio.CancelledError:
+                pass
+            self._dispatcher = None
+        if self._in_flight:
+            await asyncio.gather(*self._in_flight, return_exceptions=True)
+
+    async def submit(self, chat_id: int, send, priority=SEND_PRIORITY_DEFAULT):
+        """
+        Ставит отправку в очередь и ждёт её результата.
+        send — функция без аргументов, возвращающая корутину запроса к API;
+        при TelegramRetryAfter она будет вызвана повторно.
+        """
+        self.start()
+        job = _SendJob(chat_id, send,
+                       asyncio.get_running_loop().create_future())
+        self._push(job, priority, next(self._seq))
+        return await job.future
+
+    def _push(self, job, priority, seq):
+        heapq.heappush(self._chats.setdefault(job.chat_id, []),
+                       (priority, seq, job))
+        heapq.heappush(self._ready, (priority, seq, job.chat_id))
+        self._wakeup.set()
+
+    def _chat_delay(self, chat_id, now):
+        blocked = self._blocked_until.get(chat_id, 0.0) - now
+        if blocked > 0:
+            return blocked
+        bucket = self._buckets.get(chat_id)
+        if bucket is None:
+            bucket = self._buckets[chat_id] = TokenBucket(self.chat_rate,
+                                                          self.chat_burst)
+        return bucket.delay(now)
+
+    def _wake_sleeping(self, now):
+        while self._sleeping and self._sleeping[0][0] <= now:
+            _, chat_id = heapq.heappop(self._sleeping)
+            queue = self._chats.get(chat_id)
+            if queue:
+                priority, seq, _ = queue[0]
+                heapq.heappush(self._ready, (priority, seq, chat_id))
+
+    async def _run(self):
+        while True:
+            now = time.monotonic()
+            self._wake_sleeping(now)
+
+            if not self._ready:
+                self._wakeup.clear()
+                timeout = self._sleeping[0][0] - now if self._sleeping else None
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            priority, seq, chat_id = heapq.heappop(self._ready)
+            queue = self._chats.get(chat_id)
+            # Запись устарела: голова очереди чата уже отправлена или сменилась
+            if not queue or queue[0][:2] != (priority, seq):
+                continue
+
+            delay = self._chat_delay(chat_id, now)
+            if delay > 0:
+                heapq.heappush(self._sleeping, (now + delay, chat_id))
+                continue
+
+            global_delay = self._global.delay(now)
+            if global_delay > 0:
+                heapq.heappush(self._ready, (priority, seq, chat_id))
+                await asyncio.sleep(global_delay)
+                continue
+
+            _, _, job = heapq.heappop(queue)
+            if queue:
+                # Следующее сообщение чата встаёт в очередь готовых
+                heapq.heappush(self._ready, (*queue[0][:2], chat_id))
+            else:
+                del self._chats[chat_id]
+            if job.future.done():  # отправитель больше не ждёт
+                continue
+
+            await self._slots.acquire()
+            now = time.monotonic()
+            self._global.take(now)
+            self._buckets[chat_id].take(now)
+            task = asyncio.create_task(self._send(job, priority, seq))
+            self._in_flight.add(task)
+            task.add_done_callback(self._in_flight.discard)
+
+    async def _send(self, job: _SendJob, priority, seq):
+        wait = time.monotonic() - job.enqueued_at
+        try:
+            result = await job.send()
+        except TelegramRetryAfter as e:
+            self.flood_waits += 1
+            if job.flood_retries >= self.max_flood_retries or job.future.done():
+                self.failed += 1
+                if not job.future.done():
+                    job.future.set_exception(e)
+                return
+            job.flood_retries += 1
+            self._blocked_until[job.chat_id] = time.monotonic() + e.retry_after
+            print(f"⏳ Flood wait {e.retry_after} с для {job.chat_id}, "
+                  f"отправка отложена")
+            # Прежний seq сохраняет место сообщения в очереди чата
+            self._push(job, priority, seq)
+            return
+        except Exception as e:
+            self.failed += 1
+            if not job.future.done():
+                job.future.set_exception(e)
+            return
+        finally:
+            self._slots.release()
+
+        self.sent += 1
+        self._wait_total += wait
+        self.max_wait = max(self.max_wait, wait)
+        if not job.future.done():
+            job.future.set_result(result)
+
+    @property
+    def depth(self):
+        return sum(len(queue) for queue in self._chats.values())
+
+    def stats(self) -> dict:
+        return {
+            "depth": self.depth,
+            "chats_waiting": len(self._chats),
+            "sent": self.sent,
+            "failed": self.failed,
+            "flood_waits": self.flood_waits,
+            "avg_wait": self._wait_total / self.sent if self.sent else 0.0,
+            "max_wait": self.max_wait,
+        }
+
+
+send_scheduler = SendScheduler()
@@ -0,0 +1,139 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+
+
+class RewriteCache:
+    """
+    Персистентный кэш результатов рерайта в SQLite.
+    Ключ — хэш (нормализованный текст, промт, адрес модели).
+    Записи живут не дольше ttl секунд, при превышении max_bytes
+    вытесняются давно не использованные (LRU).
+    """
+
+    def __init__(self, path="rewrite_cache.db", max_bytes=64 * 1024 * 1024,
+                 ttl=7 * 24 * 3600):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._conn = None
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def normalize(text: str) -> str:
+        return " ".join(text.split())
+
+    @classmethod
+    def make_key(cls, text: str, prompt: str, endpoint: str) -> str:
+        payload = json.dumps([cls.normalize(text), prompt.strip(), endpoint],
+                             ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _connect(self):
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS rewrite_cache ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+                "size INTEGER NOT NULL, created REAL NOT NULL, "
+                "accessed REAL NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS ix_rewrite_cache_accessed "
+                "ON rewrite_cache (accessed)"
+            )
+            self._conn.commit()
+            row = self._conn.execute(
+                "SELECT COALESCE(SUM(size), 0) FROM rewrite_cache").fetchone()
+            self._total_bytes = row[0]
+        return self._conn
+
+    def get(self, key: str) -> str | None:
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            row = conn.execute(
+                "SELECT value, size, created FROM rewrite_cache WHERE key = ?",
+                (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+
+            value, size, created = row
+            if now - created > self.ttl:
+                conn.execute("DELETE FROM rewrite_cache WHERE key = ?", (key,))
+                conn.commit()
+                self._total_bytes -= size
+                self.misses += 1
+                return None
+
+            conn.execute("UPDATE rewrite_cache SET accessed = ? WHERE key = ?",
+                         (now, key))
+            conn.commit()
+            self.hits += 1
+            return value
+
+    def put(self, key: str, value: str):
+        now = time.time()
+        size = len(value.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            conn = self._connect()
+            old = conn.execute("SELECT size FROM rewrite_cache WHERE key = ?",
+                               (key,)).fetchone()
+            if old:
+                self._total_bytes -= old[0]
+            conn.execute(
+                "INSERT OR REPLACE INTO rewrite_cache "
+                "(key, value, size, created, accessed) VALUES (?, ?, ?, ?, ?)",
+                (key, value, size, now, now))
+            self._total_bytes += size
+            self._evict(conn, now)
+            conn.commit()
+
+    def _evict(self, conn, now: float):
+        if self._total_bytes <= self.max_bytes:
+            return
+
+        # Сначала выбрасываем протухшие записи, затем самые старые по доступу
+        expired = conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM rewrite_cache "
+            "WHERE created < ?", (now - self.ttl,)).fetchone()
+        if expired[0]:
+            conn.execute("DELETE FROM rewrite_cache WHERE created < ?",
+                         (now - self.ttl,))
+            self._total_bytes -= expired[1]
+            self.evictions += expired[0]
+
+        rows = conn.execute(
+            "SELECT key, size FROM rewrite_cache ORDER BY accessed")
+        victims = []
+        for key, size in rows:
+            if self._total_bytes <= self.max_bytes:
+                break
+            victims.append((key,))
+            self._total_bytes -= size
+        if victims:
+            conn.executemany("DELETE FROM rewrite_cache WHERE key = ?", victims)
+            self.evictions += len(victims)
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / total if total else 0.0,
+            "evictions": self.evictions,
+            "bytes": self._total_bytes,
+        }
+
+
+rewrite_cache = RewriteCache()
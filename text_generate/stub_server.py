@@ -0,0 +1,80 @@
+"""
+Локальная заглушка модельного сервера для офлайн-замеров.
+
+Повторяет маршруты настоящего сервера (/predict_tags, /predict_tags_batch,
+/rewrite). Модель имитируется одним «ускорителем»: запросы выполняются
+по очереди, каждый стоит latency секунд плюс item_latency на текст.
+
+Запуск: python -m text_generate.stub_server [--port 5000] [--no-batch]
+"""
+import argparse
+import asyncio
+import hashlib
+
+from aiohttp import web
+
+
+def _pick_tags(text: str, available_tags: list[str]) -> list[str]:
+    if not available_tags:
+        return []
+    digest = hashlib.sha256(text.encode("utf-8")).digest()
+    count = 1 + digest[0] % 2
+    return sorted({available_tags[b % len(available_tags)]
+                   for b in digest[1:1 + count]})
+
+
+def make_app(latency=0.02, item_latency=0.002, batch=True) -> web.Application:
+    model_lock = asyncio.Lock()
+    stats = {"requests": 0, "texts": 0}
+
+    async def run_model(items: int):
+        async with model_lock:
+            stats["requests"] += 1
+            stats["texts"] += items
+            await asyncio.sleep(latency + item_latency * items)
+
+    async def predict_tags(request):
+        data = await request.json()
+        await run_model(1)
+        return web.json_response(
+            {"tags": _pick_tags(data["text"], data["available_tags"])})
+
+    async def predict_tags_batch(request):
+        data = await request.json()
+        texts = data["texts"]
+        await run_model(len(texts))
+        return web.json_response({"tags": [
+            _pick_tags(text, data["available_tags"]) for text in texts
+        ]})
+
+    async def rewrite(request):
+        data = await request.json()
+        await run_model(1)
+        return web.json_response(
+            {"rewritten": f"[{data['prompt']}] {data['text']}"})
+
+    app = web.Application()
+    app["stats"] = stats
+    app.router.add_post("/predict_tags", predict_tags)
+    app.router.add_post("/rewrite", rewrite)
+    if batch:
+        app.router.add_post("/predict_tags_batch", predict_tags_batch)
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5000)
+    parser.add_argument("--latency", type=float, default=0.02)
+    parser.add_argument("--item-latency", type=float, default=0.002)
+    parser.add_argument("--no-batch", action="store_true",
+                        help="не поднимать маршрут /predict_tags_batch")
+    args = parser.parse_args()
+
+    web.run_app(make_app(args.latency, args.item_latency, not args.no_batch),
+                host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,23 +1,131 @@
-from concurrent.futures import ThreadPoolExecutor
-import requests
+import asyncio
+
+import aiohttp
+
+from transport.http_transport import http_transport
+
+
+class BatchNotSupported(Exception):
+    """Сервер не поддерживает пакетное предсказание тегов."""
 
 
 class AsyncTagPredictClient:
-    def __init__(self, url="http://localhost:5000/predict_tags", max_workers=5):
+    def __init__(self, url="http://localhost:5000/predict_tags",
+                 batch_url="http://localhost:5000/predict_tags_batch",
+                 batch_size=16, batch_window=0.05, transport=http_transport):
         self.url = url
-        self.executor = ThreadPoolExecutor(max_workers=max_workers)
+        self.batch_url = batch_url
+        self.transport = transport
+        self.batch_size = batch_size
+        self.batch_window = batch_window
+        # None — ещё не знаем, False — сервер без пакетного маршрута
+        self.batch_supported = None
+        self._pending = {}  # tuple(available_tags) -> [(text, future)]
+        self._timers = {}  # tuple(available_tags) -> TimerHandle
+        self._tasks = set()  # отправляемые пакеты, держим ссылки до конца
 
-    def predict_tags(self, text: str, available_tags: list[str]) -> list[str]:
+    async def predict_tags(self, text: str, available_tags: list[str]) -> list[str]:
         """
-        Синхронный запрос к FastAPI-серверу для предсказания тегов.
+        Запрос к FastAPI-серверу для предсказания тегов.
         Может бросить исключение.
         """
-        response = requests.post(self.url, json={
-            "text": text,
-            "available_tags": available_tags
-        })
-        response.raise_for_status()
-        return response.json().get("tags", [])
+        # Предсказание без побочных эффектов — POST можно повторять
+        data = await self.transport.request(
+            "tags", "POST", self.url,
+            retries=self.transport.max_retries, json={
+                "text": text,
+                "available_tags": available_tags
+            })
+        return data.get("tags", [])
+
+    async def predict_tags_batch(self, texts: list[str],
+                                 available_tags: list[str]) -> list[list[str]]:
+        """
+        Пакетный запрос: один список тегов на каждый текст.
+        Бросает BatchNotSupported, если у сервера нет пакетного маршрута.
+        """
+        try:
+            data = await self.transport.request(
+                "tags", "POST", self.batch_url,
+                retries=self.transport.max_retries, json={
+                    "texts": texts,
+                    "available_tags": available_tags
+                })
+        except aiohttp.ClientResponseError as e:
+            if e.status in (404, 405):
+                raise BatchNotSupported(self.batch_url) from e
+            raise
+        results = data.get("tags", [])
+        if len(results) != len(texts):
+            raise RuntimeError("Размер ответа не совпадает с размером пакета")
+        return results
+
+    async def predict_tags_batched(self, text: str,
+                                   available_tags: list[str]) -> list[str]:
+        """
+        Предсказание с микропакетированием: запросы копятся batch_window
+        секунд (или до batch_size штук) и уходят одним вызовом.
+        Без пакетного маршрута на сервере — обычные одиночные запросы.
+        """
+        if self.batch_supported is False:
+            return await self.predict_tags(text, available_tags)
+
+        loop = asyncio.get_running_loop()
+        key = tuple(available_tags)
+        future = loop.create_future()
+        batch = self._pending.setdefault(key, [])
+        batch.append((text, future))
+
+        if len(batch) >= self.batch_size:
+            self._flush(key)
+        elif key not in self._timers:
+            self._timers[key] = loop.call_later(self.batch_window,
+                                                self._flush, key)
+        return await future
+
+    def _flush(self, key):
+        timer = self._timers.pop(key, None)
+        if timer is not None:
+            timer.cancel()
+        batch = self._pending.pop(key, None)
+        if batch:
+            task = asyncio.ensure_future(self._send_batch(list(key), batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def close(self):
+        """
+        Отправляет накопленные пакеты и дожидается уже ушедших.
+        """
+        for key in list(self._pending):
+            self._flush(key)
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    async def _send_batch(self, available_tags, batch):
+        texts = [text for text, _ in batch]
+        try:
+            results = await self.predict_tags_batch(texts, available_tags)
+            self.batch_supported = True
+        except BatchNotSupported:
+            if self.batch_supported is not False:
+                print("ℹ️ Сервер тегов без пакетного маршрута, "
+                      "переходим на одиночные запросы.")
+            self.batch_supported = False
+            results = await asyncio.gather(
+                *(self.predict_tags(text, available_tags) for text in texts),
+                return_exceptions=True
+            )
+        except Exception as e:
+            results = [e] * len(batch)
+
+        for (_, future), result in zip(batch, results):
+            if future.done():
+                continue
+            if isinstance(result, BaseException):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
 
 
 tag_predict_client = AsyncTagPredictClient()
@@ -1,19 +1,20 @@
-from concurrent.futures import ThreadPoolExecutor
-import requests
+from transport.http_transport import http_transport
 
 
 class AsyncRewriteClient:
-    def __init__(self, url="http://localhost:5000/rewrite", max_workers=5):
+    def __init__(self, url="http://localhost:5000/rewrite",
+                 transport=http_transport):
         self.url = url
-        self.executor = ThreadPoolExecutor(max_workers=max_workers)
+        self.transport = transport
 
-    def rewrite(self, text: str, prompt: str) -> str:
+    async def rewrite(self, text: str, prompt: str) -> str:
         """
-        Синхронный запрос к модели. Может бросить исключение.
+        Запрос к модели. Может бросить исключение.
         """
-        response = requests.post(self.url, json={"text": text, "prompt": prompt})
-        response.raise_for_status()
-        return response.json()["rewritten"]
+        data = await self.transport.request(
+            "rewrite", "POST", self.url, retries=self.transport.max_retries,
+            json={"text": text, "prompt": prompt})
+        return data["rewritten"]
 
 
 rewrite_client = AsyncRewriteClient()
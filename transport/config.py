@@ -0,0 +1,18 @@
+# Общие настройки HTTP-транспорта для модельных клиентов и FusionBrain
+CONNECT_TIMEOUT = 5
+READ_TIMEOUT = 60
+POOL_LIMIT = 100
+KEEPALIVE_TIMEOUT = 30
+
+# Повторы при сетевых ошибках и ответах 429/5xx
+MAX_RETRIES = 2
+RETRY_BACKOFF = 0.5
+RETRY_MAX_BACKOFF = 5.0
+
+# Максимум одновременных запросов к каждому эндпоинту
+ENDPOINT_LIMITS = {
+    "tags": 8,
+    "rewrite": 4,
+    "fusionbrain": 8,
+}
+DEFAULT_ENDPOINT_LIMIT = 8
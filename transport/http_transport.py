@@ -0,0 +1,150 @@
+import asyncio
+import random
+import time
+
+import aiohttp
+
+from transport.config import CONNECT_TIMEOUT, READ_TIMEOUT, POOL_LIMIT, \
+    KEEPALIVE_TIMEOUT, MAX_RETRIES, RETRY_BACKOFF, RETRY_MAX_BACKOFF, \
+    ENDPOINT_LIMITS, DEFAULT_ENDPOINT_LIMIT
+
+RETRY_STATUSES = {429, 502, 503, 504}
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS", "PUT", "DELETE"}
+
+
+class _Retry(Exception):
+    def __init__(self, status: int):
+        super().__init__(f"HTTP {status}")
+        self.status = status
+
+
+class EndpointStats:
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.retries = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+
+    def observe(self, seconds: float, ok: bool):
+        self.calls += 1
+        if not ok:
+            self.errors += 1
+        self.total_seconds += seconds
+        self.max_seconds = max(self.max_seconds, seconds)
+
+    def as_dict(self) -> dict:
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "retries": self.retries,
+            "avg_ms": self.total_seconds / self.calls * 1000 if self.calls else 0.0,
+            "max_ms": self.max_seconds * 1000,
+        }
+
+
+class HttpTransport:
+    """
+    Общий HTTP-транспорт для клиентов тегов, рерайта и FusionBrain:
+    пул keep-alive соединений, таймауты, ограниченные повторы с джиттером,
+    лимит параллельных запросов на эндпоинт и замер задержки каждого вызова.
+    """
+
+    def __init__(self, connect_timeout=CONNECT_TIMEOUT,
+                 read_timeout=READ_TIMEOUT, pool_limit=POOL_LIMIT,
+                 max_retries=MAX_RETRIES, endpoint_limits=None):
+        self.timeout = aiohttp.ClientTimeout(sock_connect=connect_timeout,
+                                             sock_read=read_timeout)
+        self.pool_limit = pool_limit
+        self.max_retries = max_retries
+        self.endpoint_limits = dict(ENDPOINT_LIMITS if endpoint_limits is None
+                                    else endpoint_limits)
+        self._session = None
+        self._semaphores = {}
+        self._stats = {}
+
+    def _get_session(self):
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                timeout=self.timeout,
+                connector=aiohttp.TCPConnector(
+                    limit=self.pool_limit,
+                    keepalive_timeout=KEEPALIVE_TIMEOUT),
+            )
+        return self._session
+
+    def _semaphore(self, endpoint: str):
+        semaphore = self._semaphores.get(endpoint)
+        if semaphore is None:
+            limit = self.endpoint_limits.get(endpoint, DEFAULT_ENDPOINT_LIMIT)
+            semaphore = self._semaphores[endpoint] = asyncio.Semaphore(limit)
+        return semaphore
+
+    def _endpoint_stats(self, endpoint: str) -> EndpointStats:
+        stats = self._stats.get(endpoint)
+        if stats is None:
+            stats = self._stats[endpoint] = EndpointStats()
+        return stats
+
+    @staticmethod
+    def _backoff(attempt: int) -> float:
+        delay = min(RETRY_BACKOFF * 2 ** attempt, RETRY_MAX_BACKOFF)
+        return random.uniform(0, delay)  # full jitter
+
+    async def request(self, endpoint: str, method: str, url: str,
+                      retries=None, data_factory=None, **kwargs):
+        """
+        Выполняет запрос и возвращает разобранный JSON.
+        Ошибочный статус после исчерпания повторов поднимается как
+        aiohttp.ClientResponseError. data_factory позволяет заново собрать
+        тело (например, FormData) для каждой попытки.
+        По умолчанию повторяются только идемпотентные методы: POST
+        повторяется, лишь если вызывающий явно передал retries.
+        """
+        if retries is None:
+            retries = self.max_retries \
+                if method.upper() in IDEMPOTENT_METHODS else 0
+        stats = self._endpoint_stats(endpoint)
+
+        attempt = 0
+        while True:
+            if data_factory is not None:
+                kwargs["data"] = data_factory()
+
+            # Задержка считается без ожидания лимита эндпоинта
+            async with self._semaphore(endpoint):
+                start = time.perf_counter()
+                try:
+                    async with self._get_session().request(method, url,
+                                                           **kwargs) as response:
+                        if (response.status in RETRY_STATUSES
+                                and attempt < retries):
+                            raise _Retry(response.status)
+                        response.raise_for_status()
+                        result = await response.json()
+                    stats.observe(time.perf_counter() - start, ok=True)
+                    return result
+                except (_Retry, aiohttp.ClientConnectionError,
+                        asyncio.TimeoutError) as e:
+                    stats.observe(time.perf_counter() - start, ok=False)
+                    if attempt >= retries:
+                        raise
+                    stats.retries += 1
+                    print(f"🔁 {endpoint}: повтор {attempt + 1}/{retries} ({e!r})")
+                except Exception:
+                    stats.observe(time.perf_counter() - start, ok=False)
+                    raise
+
+            await asyncio.sleep(self._backoff(attempt))
+            attempt += 1
+
+    def stats(self) -> dict:
+        return {endpoint: stats.as_dict()
+                for endpoint, stats in self._stats.items()}
+
+    async def close(self):
+        if self._session and not self._session.closed:
+            await self._session.close()
+
+
+http_transport = HttpTransport()